@@ -1,10 +1,27 @@
 import requests
 import json
 from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 from neo4j import GraphDatabase
 import logging
+import os
 import webbrowser
+from contextlib import contextmanager
+
+from attck_bundle import (ENTERPRISE_ATTACK_URL, dispatch_objects, iter_stream_objects, iter_url_objects,
+                          split_external_references)
+from attck_cache import BundleCache, open_bundle
+from attck_checkpoint import Checkpoint, content_hash
+from attck_columnar import ATTCKFrames, FrameBuilder
+from attck_delta import PushState, Versions, delete_statements, is_retired, model_versions
+from attck_export import ImportExport, export_import_files, relationship_type
+from attck_index import ATTCKIndex, EndpointResolver
+from attck_snapshot import Snapshot, snapshot_is_current, write_snapshot
+from neo4j_bulk import (DEFAULT_BATCH_SIZE, DEFAULT_TX_SIZE, BulkWriter, Edge, ParallelWriter, edge_batches, ensure_schema,
+                        merge_edges, node_batches, session_runner, upsert_nodes)
+
+# Recorded in snapshots written by ATTCKnowledge.save(); the other scripts store different tables
+SNAPSHOT_KIND = 'ATTCKnowledge-push'
 
 # --- Data Models (from ATTCKnowledge.ps1) ---
 
@@ -20,6 +37,8 @@ class ATTCKTactic:
     modified: str
     contributor: List[str]
     stix: str
+    shortname: str = ""  # x_mitre_shortname, the phase_name techniques refer to
+    retired: bool = False  # revoked or x_mitre_deprecated
 
 @dataclass
 class ATTCKTechnique:
@@ -43,6 +62,7 @@ class ATTCKTechnique:
     modified: str
     contributor: List[str]
     stix: str
+    retired: bool = False  # revoked or x_mitre_deprecated
 
 @dataclass
 class ATTCKSoftware:
@@ -57,6 +77,7 @@ class ATTCKSoftware:
     modified: str
     contributor: List[str]
     stix: str
+    retired: bool = False  # revoked or x_mitre_deprecated
 
 @dataclass
 class ATTCKGroup:
@@ -70,6 +91,7 @@ class ATTCKGroup:
     modified: str
     contributor: List[str]
     stix: str
+    retired: bool = False  # revoked or x_mitre_deprecated
 
 @dataclass
 class ATTCKRelationship:
@@ -78,6 +100,114 @@ class ATTCKRelationship:
     target: str
     description: Optional[str] = ""
     reference: Optional[Any] = None
+    stix: Optional[str] = None
+    modified: Optional[str] = None
+    retired: bool = False
+
+# --- STIX object builders (one reference scan per object) ---
+
+def _tactic_from_stix(obj: Dict[str, Any]) -> ATTCKTactic:
+    refs = split_external_references(obj)
+    ext_ref = refs.primary or {}
+    return ATTCKTactic(
+        name=obj.get('name', ''),
+        description=obj.get('description', ''),
+        type=[obj.get('type', '')],
+        id=ext_ref.get('external_id', ''),
+        wiki=ext_ref.get('url', ''),
+        reference=refs.others,
+        created=obj.get('created', ''),
+        modified=obj.get('modified', ''),
+        contributor=obj.get('x_mitre_contributors', []),
+        stix=obj.get('id', ''),
+        shortname=obj.get('x_mitre_shortname', ''),
+        retired=is_retired(obj)
+    )
+
+def _technique_from_stix(obj: Dict[str, Any]) -> ATTCKTechnique:
+    refs = split_external_references(obj)
+    ext_ref = refs.primary or {}
+    return ATTCKTechnique(
+        name=obj.get('name', ''),
+        tactic=[phase.get('phase_name', '') for phase in obj.get('kill_chain_phases', [])] if obj.get('kill_chain_phases') else [],
+        description=obj.get('description', ''),
+        platform=obj.get('x_mitre_platforms', []),
+        permission=obj.get('x_mitre_permissions_required', []),
+        bypass=obj.get('x_mitre_defense_bypassed', []),
+        effective_perm=obj.get('x_mitre_effective_permissions', []),
+        network=obj.get('x_mitre_network_requirements', ''),
+        remote=obj.get('x_mitre_remote_support', ''),
+        prereq=obj.get('x_mitre_system_requirements', ''),
+        detection=obj.get('x_mitre_detection', ''),
+        mitigation="",  # Populated below
+        data_source=obj.get('x_mitre_data_sources', []),
+        id=ext_ref.get('external_id', ''),
+        wiki=ext_ref.get('url', ''),
+        reference=refs.others,
+        created=obj.get('created', ''),
+        modified=obj.get('modified', ''),
+        contributor=obj.get('x_mitre_contributors', []),
+        stix=obj.get('id', ''),
+        retired=is_retired(obj)
+    )
+
+def _group_from_stix(obj: Dict[str, Any]) -> ATTCKGroup:
+    refs = split_external_references(obj)
+    ext_ref = refs.primary or {}
+    return ATTCKGroup(
+        name=obj.get('name', ''),
+        description=obj.get('description', ''),
+        alias=obj.get('aliases', []),
+        id=ext_ref.get('external_id', ''),
+        wiki=ext_ref.get('url', ''),
+        reference=refs.others,
+        created=obj.get('created', ''),
+        modified=obj.get('modified', ''),
+        contributor=obj.get('x_mitre_contributors', []),
+        stix=obj.get('id', ''),
+        retired=is_retired(obj)
+    )
+
+def _software_from_stix(obj: Dict[str, Any]) -> ATTCKSoftware:
+    refs = split_external_references(obj)
+    ext_ref = refs.primary or {}
+    return ATTCKSoftware(
+        name=obj.get('name', ''),
+        description=obj.get('description', ''),
+        type=obj.get('type', ''),
+        alias=obj.get('x_mitre_aliases', []),
+        id=ext_ref.get('external_id', ''),
+        wiki=ext_ref.get('url', ''),
+        reference=refs.others,
+        created=obj.get('created', ''),
+        modified=obj.get('modified', ''),
+        contributor=obj.get('x_mitre_contributors', []),
+        stix=obj.get('id', ''),
+        retired=is_retired(obj)
+    )
+
+def _relationship_from_stix(obj: Dict[str, Any]) -> ATTCKRelationship:
+    return ATTCKRelationship(
+        source=obj.get('source_ref', ''),
+        edge=obj.get('relationship_type', ''),
+        target=obj.get('target_ref', ''),
+        description=obj.get('description', ''),
+        reference=obj.get('external_references', []),
+        stix=obj.get('id', ''),
+        modified=obj.get('modified', ''),
+        retired=is_retired(obj)
+    )
+
+# STIX type -> (ATTCKnowledge attribute, builder)
+STIX_MODEL_BUILDERS: Dict[str, Tuple[str, Callable[[Dict[str, Any]], Any]]] = {
+    'x-mitre-tactic': ('tactics', _tactic_from_stix),
+    'attack-pattern': ('techniques', _technique_from_stix),
+    'intrusion-set': ('groups', _group_from_stix),
+    'tool': ('software', _software_from_stix),
+    'malware': ('software', _software_from_stix),
+    'software': ('software', _software_from_stix),
+    'relationship': ('relationships', _relationship_from_stix),
+}
 
 # --- ATTCKnowledge Loader (from ATTCKnowledge.ps1) ---
 
@@ -88,161 +218,325 @@ class ATTCKnowledge:
         self.software: List[ATTCKSoftware] = []
         self.groups: List[ATTCKGroup] = []
         self.relationships: List[ATTCKRelationship] = []
+        self._index: Optional[ATTCKIndex] = None
 
-    def sync(self):
+    def sync(self, stream: bool = False, cache: Optional[BundleCache] = None, bundle_path: Optional[str] = None):
+        # Read a pinned local bundle, or the cached copy (revalidated with ETag/Last-Modified)
+        if bundle_path or cache is not None:
+            with (open_bundle(bundle_path) if bundle_path else cache.open(ENTERPRISE_ATTACK_URL)) as fp:
+                self.parse_objects(iter_stream_objects(fp))
+            return
         # Download MITRE ATT&CK enterprise data
-        url = 'https://raw.githubusercontent.com/mitre/cti/master/enterprise-attack/enterprise-attack.json'
-        response = requests.get(url)
+        if stream:
+            # Walk the objects array as the body arrives instead of holding the whole bundle
+            self.parse_objects(iter_url_objects(ENTERPRISE_ATTACK_URL))
+            return
+        response = requests.get(ENTERPRISE_ATTACK_URL)
         response.raise_for_status()
         data = response.json()
-        objects = data.get('objects', [])
+        self.parse_objects(data.get('objects', []))
+
+    def parse_objects(self, objects: Iterable[Dict[str, Any]]):
+        # Parse objects into data classes in a single pass, dispatching on STIX type
+        self._index = None
+        handlers = {}
+        for stix_type, (attr, build) in STIX_MODEL_BUILDERS.items():
+            handlers[stix_type] = self._appender(getattr(self, attr), build)
+        dispatch_objects(objects, handlers)
+
+    @staticmethod
+    def _appender(target: List[Any], build: Callable[[Dict[str, Any]], Any]) -> Callable[[Dict[str, Any]], None]:
+        append = target.append
+        return lambda obj: append(build(obj))
 
-        # Parse objects into data classes
+    def iter_objects(self, path: Optional[str] = None) -> Iterator[Any]:
+        """Yield typed ATT&CK objects one at a time from the live bundle, or from a local (.json/.zst) file."""
+        if path:
+            with open_bundle(path) as fp:
+                yield from filter(None, map(self._to_model, iter_stream_objects(fp)))
+            return
+        yield from filter(None, map(self._to_model, iter_url_objects(ENTERPRISE_ATTACK_URL)))
+
+    @staticmethod
+    def _to_model(obj: Dict[str, Any]) -> Optional[Any]:
+        entry = STIX_MODEL_BUILDERS.get(obj.get('type'))
+        return entry[1](obj) if entry else None
+
+    @property
+    def index(self) -> ATTCKIndex:
+        """STIX id / ATT&CK id / tactic shortname lookups over every parsed object, built on first use."""
+        if self._index is None:
+            self._index = ATTCKIndex.build(
+                self.tactics, [*self.techniques, *self.software, *self.groups, *self.relationships])
+        return self._index
+
+    def versions(self) -> Versions:
+        """STIX id -> (modified, retired) for every parsed object, as diffed by a delta push."""
+        return model_versions(obj for kind in ATTCKFrames.KINDS for obj in getattr(self, kind))
+
+    # --- Columnar (Polars) representation, see attck_columnar.py ---
+
+    def to_frames(self) -> ATTCKFrames:
+        return ATTCKFrames.from_records({kind: map(asdict, getattr(self, kind)) for kind in ATTCKFrames.KINDS})
+
+    @classmethod
+    def from_frames(cls, frames: ATTCKFrames) -> "ATTCKnowledge":
+        attck = cls()
+        attck.tactics = [ATTCKTactic(**row) for row in frames.records('tactics')]
+        attck.techniques = [ATTCKTechnique(**row) for row in frames.records('techniques')]
+        attck.software = [ATTCKSoftware(**row) for row in frames.records('software')]
+        attck.groups = [ATTCKGroup(**row) for row in frames.records('groups')]
+        attck.relationships = [ATTCKRelationship(**row) for row in frames.records('relationships')]
+        return attck
+
+    @staticmethod
+    def frames_from_objects(objects: Iterable[Dict[str, Any]]) -> ATTCKFrames:
+        """Build the columnar knowledge base straight from (streamed) STIX objects, one row at a time."""
+        builders = {kind: FrameBuilder(kind) for kind in ATTCKFrames.KINDS}
         for obj in objects:
-            if obj.get('type') == 'x-mitre-tactic':
-                ext_ref = next((ref for ref in obj.get('external_references', []) if ref.get('source_name') == 'mitre-attack'), {})
-                self.tactics.append(ATTCKTactic(
-                    name=obj.get('name', ''),
-                    description=obj.get('description', ''),
-                    type=[obj.get('type', '')],
-                    id=ext_ref.get('external_id', ''),
-                    wiki=ext_ref.get('url', ''),
-                    reference=[ref for ref in obj.get('external_references', []) if ref.get('source_name') != 'mitre-attack'],
-                    created=obj.get('created', ''),
-                    modified=obj.get('modified', ''),
-                    contributor=obj.get('x_mitre_contributors', []),
-                    stix=obj.get('id', '')
-                ))
-            elif obj.get('type') == 'attack-pattern':
-                ext_ref = next((ref for ref in obj.get('external_references', []) if ref.get('source_name') == 'mitre-attack'), {})
-                self.techniques.append(ATTCKTechnique(
-                    name=obj.get('name', ''),
-                    tactic=[phase.get('phase_name', '') for phase in obj.get('kill_chain_phases', [])] if obj.get('kill_chain_phases') else [],
-                    description=obj.get('description', ''),
-                    platform=obj.get('x_mitre_platforms', []),
-                    permission=obj.get('x_mitre_permissions_required', []),
-                    bypass=obj.get('x_mitre_defense_bypassed', []),
-                    effective_perm=obj.get('x_mitre_effective_permissions', []),
-                    network=obj.get('x_mitre_network_requirements', ''),
-                    remote=obj.get('x_mitre_remote_support', ''),
-                    prereq=obj.get('x_mitre_system_requirements', ''),
-                    detection=obj.get('x_mitre_detection', ''),
-                    mitigation="",  # Populated below
-                    data_source=obj.get('x_mitre_data_sources', []),
-                    id=ext_ref.get('external_id', ''),
-                    wiki=ext_ref.get('url', ''),
-                    reference=[ref for ref in obj.get('external_references', []) if ref.get('source_name') != 'mitre-attack'],
-                    created=obj.get('created', ''),
-                    modified=obj.get('modified', ''),
-                    contributor=obj.get('x_mitre_contributors', []),
-                    stix=obj.get('id', '')
-                ))
-            elif obj.get('type') == 'intrusion-set':
-                ext_ref = next((ref for ref in obj.get('external_references', []) if ref.get('source_name') == 'mitre-attack'), {})
-                self.groups.append(ATTCKGroup(
-                    name=obj.get('name', ''),
-                    description=obj.get('description', ''),
-                    alias=obj.get('aliases', []),
-                    id=ext_ref.get('external_id', ''),
-                    wiki=ext_ref.get('url', ''),
-                    reference=[ref for ref in obj.get('external_references', []) if ref.get('source_name') != 'mitre-attack'],
-                    created=obj.get('created', ''),
-                    modified=obj.get('modified', ''),
-                    contributor=obj.get('x_mitre_contributors', []),
-                    stix=obj.get('id', '')
-                ))
-            elif obj.get('type') in ('tool', 'malware', 'software'):
-                ext_ref = next((ref for ref in obj.get('external_references', []) if ref.get('source_name') == 'mitre-attack'), {})
-                self.software.append(ATTCKSoftware(
-                    name=obj.get('name', ''),
-                    description=obj.get('description', ''),
-                    type=obj.get('type', ''),
-                    alias=obj.get('x_mitre_aliases', []),
-                    id=ext_ref.get('external_id', ''),
-                    wiki=ext_ref.get('url', ''),
-                    reference=[ref for ref in obj.get('external_references', []) if ref.get('source_name') != 'mitre-attack'],
-                    created=obj.get('created', ''),
-                    modified=obj.get('modified', ''),
-                    contributor=obj.get('x_mitre_contributors', []),
-                    stix=obj.get('id', '')
-                ))
-            elif obj.get('type') == 'relationship':
-                self.relationships.append(ATTCKRelationship(
-                    source=obj.get('source_ref', ''),
-                    edge=obj.get('relationship_type', ''),
-                    target=obj.get('target_ref', ''),
-                    description=obj.get('description', ''),
-                    reference=obj.get('external_references', [])
-                ))
+            entry = STIX_MODEL_BUILDERS.get(obj.get('type'))
+            if entry:
+                attr, build = entry
+                builders[attr].append(asdict(build(obj)))
+        return ATTCKFrames({kind: builder.finish() for kind, builder in builders.items()})
+
+    # --- Binary snapshots, see attck_snapshot.py ---
+
+    def save(self, path: str, meta: Optional[Dict[str, Any]] = None):
+        write_snapshot(path, {kind: getattr(self, kind) for kind in ATTCKFrames.KINDS}, {**(meta or {}), "kind": SNAPSHOT_KIND})
+
+    @classmethod
+    def load(cls, path: str) -> "ATTCKnowledge":
+        """Load a snapshot written by save(); description/reference/detection are decoded on first access."""
+        snapshot = Snapshot(path, kind=SNAPSHOT_KIND)
+        attck = cls()
+        attck.tactics = snapshot.load_objects('tactics', ATTCKTactic)
+        attck.techniques = snapshot.load_objects('techniques', ATTCKTechnique)
+        attck.software = snapshot.load_objects('software', ATTCKSoftware)
+        attck.groups = snapshot.load_objects('groups', ATTCKGroup)
+        attck.relationships = snapshot.load_objects('relationships', ATTCKRelationship)
+        return attck
+
+    # --- Offline neo4j-admin import files, see attck_export.py ---
+
+    def export_import(self, directory: str, mapping: str = "bloodhound", compress: bool = True) -> ImportExport:
+        """Node/relationship CSVs for `neo4j-admin database import`, labelled as pushed ("bloodhound") or as ATT&CK ("attck")."""
+        return export_import_files(self, directory, mapping=mapping, compress=compress, index=self.index)
+
+    @classmethod
+    def sync_frames(cls, cache: Optional[BundleCache] = None, bundle_path: Optional[str] = None) -> ATTCKFrames:
+        """Like sync(stream=True), but returns the columnar representation instead of dataclass lists."""
+        if bundle_path or cache is not None:
+            with (open_bundle(bundle_path) if bundle_path else cache.open(ENTERPRISE_ATTACK_URL)) as fp:
+                return cls.frames_from_objects(iter_stream_objects(fp))
+        return cls.frames_from_objects(iter_url_objects(ENTERPRISE_ATTACK_URL))
 
 # --- Neo4j/BloodHound Integration (from PushToBH.ps1, CypherDog15_Alpha3.ps1) ---
 
 class BloodHoundGraph:
     def __init__(self, uri="bolt://localhost:7687", user="neo4j", password="neo4j"):
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        # Set while inside bulk(): writes then share its session and transactions.
+        self.writer: Optional[BulkWriter] = None
 
     def close(self):
         self.driver.close()
 
+    def ensure_schema(self, unique: Iterable[Tuple[str, str]], indexed: Iterable[Tuple[str, str]] = ()):
+        # Idempotently create constraints/indexes for the (label, property) keys we MERGE on and wait for them
+        return ensure_schema(session_runner(self.driver), unique, indexed)
+
+    @contextmanager
+    def bulk(self, tx_size: int = DEFAULT_TX_SIZE, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[BulkWriter]:
+        # Route every write made inside the block through one session, tx_size statements per transaction
+        if self.writer is not None:
+            # Already inside bulk(): join the caller's writer
+            yield self.writer
+            return
+        with BulkWriter(self.driver, tx_size=tx_size, batch_size=batch_size) as writer:
+            self.writer = writer
+            try:
+                yield writer
+            finally:
+                self.writer = None
+
     def create_node(self, label: str, properties: Dict[str, Any]):
         # Merge node to avoid duplicates
         props = {k: v for k, v in properties.items() if v not in (None, '', [], {})}
         query = f"MERGE (n:{label} {{id: $id}}) SET n += $props"
+        self.run_query(query, {'id': props['id'], 'props': props})
+
+    def create_nodes(self, label: str, properties_list: Iterable[Dict[str, Any]],
+                     batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        # Bulk create_node(): one UNWIND ... MERGE statement per batch, all batches over one session
+        rows = _node_rows(properties_list)
+        if self.writer is not None:
+            return self.writer.write_nodes(label, rows, key='id')
         with self.driver.session() as session:
-            session.run(query, id=props['id'], props=props)
+            return upsert_nodes(session, label, rows, key='id', batch_size=batch_size)
 
     def create_relationship(self, src_label: str, src_id: str, rel: str, tgt_label: str, tgt_id: str):
         query = (
             f"MATCH (a:{src_label} {{id: $src_id}}), (b:{tgt_label} {{id: $tgt_id}}) "
-            f"MERGE (a)-[r:{rel.upper()}]->(b)"
+            f"MERGE (a)-[r:{relationship_type(rel)}]->(b)"
         )
+        self.run_query(query, {'src_id': src_id, 'tgt_id': tgt_id})
+
+    def create_relationships(self, edges: Iterable[Edge], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        # Bulk create_relationship(): (src_label, src_id, rel, tgt_label, tgt_id) rows, one UNWIND per label pair/type
+        rows = _edge_rows(edges)
+        if self.writer is not None:
+            return self.writer.write_edges(rows, key='id')
         with self.driver.session() as session:
-            session.run(query, src_id=src_id, tgt_id=tgt_id)
+            return merge_edges(session, rows, key='id', batch_size=batch_size)
+
+    def write_parallel(self, nodes: Dict[str, Iterable[Dict[str, Any]]], edges: Iterable[Edge],
+                       workers: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> ParallelWriter:
+        # create_nodes() for every label, then create_relationships(), spread over `workers` sessions
+        writer = ParallelWriter(self.driver, workers=workers, batch_size=batch_size)
+        writer.write({label: _node_rows(properties_list) for label, properties_list in nodes.items()}, _edge_rows(edges), key='id')
+        return writer
 
     def run_query(self, query: str, params: dict = None):
+        if self.writer is not None:
+            return self.writer.run(query, params or {})
         with self.driver.session() as session:
             return list(session.run(query, params or {}))
 
+def _node_rows(properties_list: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    return ({k: v for k, v in properties.items() if v not in (None, '', [], {})} for properties in properties_list)
+
+def _edge_rows(edges: Iterable[Edge]) -> Iterator[Edge]:
+    # STIX relationship types as Cypher types: subtechnique-of -> SUBTECHNIQUE_OF
+    return ((src_label, src_id, relationship_type(rel), tgt_label, tgt_id) for src_label, src_id, rel, tgt_label, tgt_id in edges)
+
 # --- PushToBH Logic (from PushToBH.ps1) ---
 
-def push_attck_to_bloodhound(attck: ATTCKnowledge, bh: BloodHoundGraph):
-    # Tactics as OU
-    for tactic in attck.tactics:
-        bh.create_node("OU", asdict(tactic))
-    # Techniques as GPO
-    for technique in attck.techniques:
-        bh.create_node("GPO", asdict(technique))
-    # Software as Computer
-    for sw in attck.software:
-        bh.create_node("Computer", asdict(sw))
-    # Groups as Group
-    for group in attck.groups:
-        bh.create_node("Group", asdict(group))
-    # Relationships (Technique <-> Tactic, etc.)
+# ATTCKnowledge attribute -> BloodHound node label
+NODE_LABELS = {
+    'tactics': 'OU',          # Tactics as OU
+    'techniques': 'GPO',      # Techniques as GPO
+    'software': 'Computer',   # Software as Computer
+    'groups': 'Group',        # Groups as Group
+}
+
+def push_attck_to_bloodhound(attck: ATTCKnowledge, bh: BloodHoundGraph, state_path: Optional[str] = None,
+                             workers: Optional[int] = None, checkpoint_path: Optional[str] = None, resume: bool = False):
+    # With state_path, push only what changed since the push that wrote it (see attck_delta.py):
+    # new and modified objects are upserted, revoked/deprecated/removed ones are deleted.
+    # With workers, nodes and relationships are written by that many parallel sessions (see neo4j_bulk.ParallelWriter).
+    # With checkpoint_path, every committed batch is recorded there; resume skips the batches an interrupted
+    # push of the same content already committed (see attck_checkpoint.py). Parallel pushes are not checkpointed.
+    state = PushState.load(state_path) if state_path else None
+    versions = attck.versions()
+    checkpoint = Checkpoint.open(None if workers else checkpoint_path, content_hash(versions), resume=resume)
+    if checkpoint.resumed:
+        print(f"Resuming from checkpoint {checkpoint_path}: {checkpoint.stages}")
+    resolver = endpoint_resolver(attck)
+    # Diff only what a push writes, so unpushable relationships are not "created" again on every run
+    pushed = _pushed_versions(attck, versions, resolver)
+    delta = state.diff(pushed) if state is not None else None
+    upserts = delta.upserts if delta is not None else None
+
+    def changed(stix: Optional[str]) -> bool:
+        return upserts is None or stix in upserts
+
+    # Every label is MERGEd on id; make those lookups index-backed before writing
+    bh.ensure_schema([(label, 'id') for label in NODE_LABELS.values()])
+    nodes = {label: [asdict(obj) for obj in getattr(attck, kind) if changed(obj.stix)] for kind, label in NODE_LABELS.items()}
+    # Relationships (Technique <-> Tactic, etc.), written in batches once collected
+    edges: List[Edge] = []
+    relinked: List[str] = []
     for technique in attck.techniques:
-        for tactic_name in technique.tactic:
-            # Find tactic node by name
-            tactic = next((t for t in attck.tactics if t.name == tactic_name), None)
+        if not changed(technique.stix):
+            continue
+        if delta is not None and technique.stix in delta.update:
+            # The technique's kill chain phases may have changed; drop its old tactic edges first.
+            relinked.append(technique.id)
+        for phase_name in technique.tactic:
+            # Kill chain phase names are tactic shortnames
+            tactic = resolver.tactic(phase_name)
             if tactic:
-                bh.create_relationship("GPO", technique.id, "USES", "OU", tactic.id)
+                edges.append(("GPO", technique.id, "USES", *tactic))
+    for rel in attck.relationships:
+        # Map STIX IDs to node labels and ids
+        src = resolver.resolve(rel.source)
+        tgt = resolver.resolve(rel.target)
+        if src and tgt and changed(rel.stix):
+            edges.append((*src, rel.edge, *tgt))
+
+    # All deletes and writes share one session and a few large transactions (see neo4j_bulk.BulkWriter)
+    with bh.bulk() as writer:
+        if delta is not None:
+            print(f"Delta push: {delta.summary()}")
+            deletes = [*delete_statements(state, state.retractions(delta)),
+                       *(("MATCH (:GPO {id: $id})-[r:USES]->(:OU) DELETE r", {'id': technique_id})
+                         for technique_id in relinked)]
+            # The deletes are a stage of their own, committed before any upsert: a resumed push must not
+            # delete again the edges whose re-creating batches the checkpoint skips.
+            for index, statements in checkpoint.pending("deletes", [deletes]):
+                for query, params in statements:
+                    bh.run_query(query, params)
+                if checkpoint.path:
+                    writer.commit()
+                    checkpoint.commit("deletes", index)
+        if not workers:
+            # Same statements as create_nodes()/create_relationships(), numbered per stage for the checkpoint
+            stages = [(f"nodes:{label}", node_batches(label, _node_rows(properties_list), key='id', batch_size=writer.batch_size))
+                      for label, properties_list in nodes.items()]
+            stages.append(("edges", edge_batches(_edge_rows(edges), key='id', batch_size=writer.batch_size)))
+            for stage, batches in stages:
+                for index, (query, rows) in checkpoint.pending(stage, batches):
+                    writer.run(query, {'rows': rows})
+                    if checkpoint.path:
+                        writer.commit()  # durable before it is recorded as committed
+                        checkpoint.commit(stage, index)
+    if workers:
+        writer = bh.write_parallel(nodes, edges, workers=workers)
+    print(f"Push complete: {writer.summary()}")
+
+    if state_path:
+        _push_state(attck, pushed, resolver).save(state_path)
+    checkpoint.finish()
+
+def _pushed_versions(attck: ATTCKnowledge, versions: Versions, resolver: EndpointResolver) -> Versions:
+    """The versions of what a push writes: node objects, and relationships whose endpoints both have a node label
+    (e.g. not course-of-action 'mitigates' edges)."""
+    pushed = {obj.stix for kind in NODE_LABELS for obj in getattr(attck, kind)}
+    pushed.update(rel.stix for rel in attck.relationships
+                  if resolver.resolve(rel.source) and resolver.resolve(rel.target))
+    return {stix: version for stix, version in versions.items() if stix in pushed}
+
+def _push_state(attck: ATTCKnowledge, versions: Versions, resolver: EndpointResolver) -> PushState:
+    """Record where every live (non-retired) object now sits in the graph, for the next delta push."""
+    state = PushState()
+    for kind, label in NODE_LABELS.items():
+        for obj in getattr(attck, kind):
+            if obj.stix in versions and not obj.retired:
+                state.add_node(obj.stix, obj.modified, label, obj.id)
     for rel in attck.relationships:
-        # Map STIX IDs to node labels
-        src_label = stix_type_to_label(rel.source)
-        tgt_label = stix_type_to_label(rel.target)
-        if src_label and tgt_label:
-            bh.create_relationship(src_label, rel.source, rel.edge, tgt_label, rel.target)
+        src = resolver.resolve(rel.source)
+        tgt = resolver.resolve(rel.target)
+        if src and tgt and rel.stix in versions and not rel.retired:
+            state.add_edge(rel.stix, rel.modified, src[0], src[1], relationship_type(rel.edge), tgt[0], tgt[1])
+    return state
+
+# STIX object type -> BloodHound node label
+STIX_LABELS = {
+    'intrusion-set': 'Group',
+    'attack-pattern': 'GPO',
+    'malware': 'Computer',
+    'tool': 'Computer',
+    'x-mitre-tactic': 'OU',
+}
+
+def endpoint_resolver(attck: ATTCKnowledge) -> EndpointResolver:
+    # Relationship endpoints as (label, id) of the nodes pushed above, via the knowledge base's hash index
+    return EndpointResolver(attck.index, STIX_LABELS, key='id')
 
 def stix_type_to_label(stix_id: str) -> Optional[str]:
     # Map STIX object types to BloodHound node labels
-    if stix_id.startswith("intrusion-set--"):
-        return "Group"
-    elif stix_id.startswith("attack-pattern--"):
-        return "GPO"
-    elif stix_id.startswith("malware--") or stix_id.startswith("tool--"):
-        return "Computer"
-    elif stix_id.startswith("x-mitre-tactic--"):
-        return "OU"
-    return None
+    return STIX_LABELS.get(stix_id.split('--', 1)[0])
 
 # --- CypherDog-like Query Functions (from CypherDog15_Alpha3.ps1) ---
 
@@ -269,18 +563,45 @@ def show_tactic_count(bh: BloodHoundGraph):
 
 def main():
     # 1. Download and parse MITRE ATT&CK data
-    print("Syncing MITRE ATT&CK knowledge...")
-    attck = ATTCKnowledge()
-    attck.sync()
+    # Set ATTCK_SNAPSHOT to a directory to reuse the parsed knowledge base across runs. It is rebuilt when
+    # the cached bundle changes (a new ATT&CK release) or was written by another script.
+    snapshot_path = os.environ.get("ATTCK_SNAPSHOT")
+    cache = BundleCache()
+    bundles = cache.digests([ENTERPRISE_ATTACK_URL]) if snapshot_path else {}
+    if snapshot_is_current(snapshot_path, SNAPSHOT_KIND, bundles):
+        print(f"Loading MITRE ATT&CK knowledge from snapshot {snapshot_path}...")
+        attck = ATTCKnowledge.load(snapshot_path)
+    else:
+        print("Syncing MITRE ATT&CK knowledge...")
+        attck = ATTCKnowledge()
+        attck.sync(cache=cache)
+        if snapshot_path:
+            attck.save(snapshot_path, meta={"source": ENTERPRISE_ATTACK_URL, "bundles": bundles})
     print(f"Loaded {len(attck.tactics)} tactics, {len(attck.techniques)} techniques, {len(attck.software)} software, {len(attck.groups)} groups.")
 
+    # Set ATTCK_EXPORT to a directory (e.g. under the server's import/ directory) to write
+    # neo4j-admin import files for a fresh database instead of pushing over Bolt.
+    export_path = os.environ.get("ATTCK_EXPORT")
+    if export_path:
+        export = attck.export_import(export_path, mapping=os.environ.get("ATTCK_EXPORT_LABELS", "bloodhound"))
+        print(f"Wrote {sum(export.counts.values())} rows to {export_path}; load them into a stopped, empty database with:")
+        print(export.command())
+        return
+
     # 2. Connect to Neo4j/BloodHound
     print("Connecting to Neo4j...")
     bh = BloodHoundGraph(uri="bolt://localhost:7687", user="neo4j", password="neo4j")
 
     # 3. Push MITRE ATT&CK data to BloodHound
+    # Set ATTCK_PUSH_STATE to a file to only push the changes since the previous run,
+    # and ATTCK_PUSH_WORKERS to write with that many parallel sessions.
+    # Set ATTCK_PUSH_CHECKPOINT to a file to record committed batches, and ATTCK_PUSH_RESUME=1 to
+    # continue an interrupted push from it.
     print("Pushing ATT&CK data to BloodHound...")
-    push_attck_to_bloodhound(attck, bh)
+    push_attck_to_bloodhound(attck, bh, state_path=os.environ.get("ATTCK_PUSH_STATE"),
+                             workers=int(os.environ.get("ATTCK_PUSH_WORKERS", "0")) or None,
+                             checkpoint_path=os.environ.get("ATTCK_PUSH_CHECKPOINT"),
+                             resume=os.environ.get("ATTCK_PUSH_RESUME") == "1")
 
     # 4. Run example CypherDog queries
     print("Relationship types in BloodHound:")
@@ -0,0 +1,205 @@
+"""
+Incremental reader for STIX 2.x bundles such as MITRE's enterprise-attack.json.
+
+The ATT&CK bundles are tens of MB on disk and several times that once
+``json.loads`` has turned them into Python objects. The helpers here walk the
+top-level ``objects`` array one element at a time, so only a single STIX object
+is materialised at any moment and peak memory stays flat regardless of bundle
+size.
+
+    for obj in iter_url_objects(ENTERPRISE_ATTACK_URL):
+        ...
+
+It also holds the per-object helpers shared by the parsers: a single-scan split
+of ``external_references`` and a type-to-handler dispatch loop.
+"""
+
+import codecs
+import json
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import requests
+
+# Read size for files and HTTP bodies; large enough to amortise decoder restarts
+# on multi-KB technique objects, small enough to keep the buffer negligible.
+CHUNK_SIZE = 1 << 16
+
+ENTERPRISE_ATTACK_URL = "https://raw.githubusercontent.com/mitre/cti/master/enterprise-attack/enterprise-attack.json"
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+_decoder = json.JSONDecoder()
+
+
+class _ChunkReader:
+    """Sliding text buffer over an iterator of decoded chunks."""
+
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next non-empty chunk, dropping the consumed prefix."""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of STIX bundle")
+
+    def take(self, expected: str) -> str:
+        char = self.peek()
+        if char not in expected:
+            raise ValueError(f"Malformed STIX bundle: expected one of {expected!r}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def decode(self) -> Any:
+        """Decode one complete JSON value, pulling more chunks until it fits."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A scalar ending exactly at the buffer edge may have been cut short. So may a number
+            # followed only by number characters: "7." is the valid prefix "7" of "7.5e10".
+            tail = end
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                while tail < len(self.buf) and self.buf[tail] in _NUMBER_CHARS:
+                    tail += 1
+            if tail == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_bundle_objects(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the elements of a bundle's top-level ``objects`` array one by one.
+    ``chunks`` is any iterable of text fragments; other top-level keys are
+    decoded and discarded.
+    """
+    reader = _ChunkReader(iter(chunks))
+    reader.take("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode()
+        reader.take(":")
+        if key == "objects":
+            reader.take("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.decode()
+                    if reader.take(",]") == "]":
+                        break
+        else:
+            reader.decode()
+        if reader.take(",}") == "}":
+            return
+
+
+def iter_text_chunks(raw_chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decode UTF-8 byte chunks, keeping multi-byte sequences split across chunks intact."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for raw in raw_chunks:
+        yield decoder.decode(raw)
+    yield decoder.decode(b"", final=True)
+
+
+def iter_stream_objects(fp: IO[bytes], chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Stream bundle objects from an open binary file object."""
+    return iter_bundle_objects(iter_text_chunks(iter(lambda: fp.read(chunk_size), b"")))
+
+
+def iter_file_objects(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Stream bundle objects from a local JSON file."""
+    with open(path, "rb") as fp:
+        yield from iter_stream_objects(fp, chunk_size)
+
+
+def iter_response_objects(response: requests.Response, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Stream bundle objects from a ``requests`` response opened with ``stream=True``."""
+    return iter_bundle_objects(iter_text_chunks(response.iter_content(chunk_size)))
+
+
+def iter_url_objects(url: str, session: Optional[requests.Session] = None,
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Download a bundle and yield its objects while the body is still arriving."""
+    http = session or requests
+    with http.get(url, stream=True) as response:
+        response.raise_for_status()
+        yield from iter_response_objects(response, chunk_size)
+
+
+def is_attack_reference(ref: Dict[str, Any]) -> bool:
+    """True for the Enterprise ``mitre-attack`` reference that carries the ATT&CK ID and URL."""
+    return ref.get("source_name") == "mitre-attack"
+
+
+def is_mitre_reference(ref: Dict[str, Any]) -> bool:
+    """True for any MITRE domain reference (mitre-attack, mitre-mobile-attack, mitre-pre-attack, ...)."""
+    return ref.get("source_name", "").startswith("mitre")
+
+
+class ExternalReferences(NamedTuple):
+    """An object's external references, split once into the ATT&CK reference and the rest."""
+
+    primary: Optional[Dict[str, Any]]
+    others: List[Dict[str, Any]]
+
+    @property
+    def external_id(self) -> Optional[str]:
+        return self.primary.get("external_id") if self.primary else None
+
+    @property
+    def url(self) -> Optional[str]:
+        return self.primary.get("url") if self.primary else None
+
+
+def split_external_references(obj: Dict[str, Any],
+                              match: Callable[[Dict[str, Any]], bool] = is_attack_reference) -> ExternalReferences:
+    """
+    Scan ``external_references`` once: the first reference accepted by ``match``
+    becomes ``primary``, every reference it rejects goes to ``others``.
+    """
+    primary = None
+    others = []
+    for ref in obj.get("external_references", []):
+        if match(ref):
+            if primary is None:
+                primary = ref
+        else:
+            others.append(ref)
+    return ExternalReferences(primary, others)
+
+
+def dispatch_objects(objects: Iterable[Dict[str, Any]],
+                     handlers: Dict[str, Callable[[Dict[str, Any]], None]]) -> None:
+    """Single pass over ``objects``, calling the handler registered for each object's STIX type."""
+    for obj in objects:
+        handler = handlers.get(obj.get("type"))
+        if handler is not None:
+            handler(obj)
@@ -0,0 +1,146 @@
+"""
+On-disk cache for ATT&CK STIX bundles.
+
+Bundles are stored content-addressed (sha256 of the raw JSON) as zstd frames
+under ``<cache_dir>/objects/``. ``index.json`` maps each source URL to its
+current blob together with the ETag/Last-Modified validators, so a refresh is
+a conditional GET that usually comes back 304 - or no request at all while the
+entry is younger than ``max_age``.
+
+Offline mode (``offline=True`` or ``ATTCK_OFFLINE=1``) never touches the
+network and serves whatever the cache holds; ``open_bundle`` reads a pinned
+local bundle (plain or ``.zst``) for air-gapped and CI runs.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import IO, Any, Dict, Iterable, Optional
+
+import requests
+import zstandard
+
+from attck_bundle import CHUNK_SIZE
+
+DEFAULT_CACHE_DIR = os.environ.get("ATTCK_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "attck"))
+# ATT&CK ships a couple of releases a year; revalidating once a day is plenty.
+DEFAULT_MAX_AGE = 24 * 60 * 60
+ZSTD_LEVEL = 10
+
+
+def open_bundle(path: str) -> IO[bytes]:
+    """Open a local bundle for reading, transparently decompressing ``.zst`` files."""
+    fp = open(path, "rb")
+    if path.endswith(".zst"):
+        return zstandard.ZstdDecompressor().stream_reader(fp)
+    return fp
+
+
+class BundleCache:
+    """Content-addressed, revalidating cache of STIX bundles keyed by URL."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_age: float = DEFAULT_MAX_AGE,
+                 offline: Optional[bool] = None, session: Optional[requests.Session] = None):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.offline = offline if offline is not None else os.environ.get("ATTCK_OFFLINE", "") not in ("", "0")
+        self.session = session or requests.Session()
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._index_lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._index_path) as fh:
+                index: Dict[str, Dict[str, Any]] = json.load(fh)
+                return index
+        except FileNotFoundError:
+            return {}
+
+    def _save_entry(self, url: str, entry: Dict[str, Any]) -> None:
+        # Re-read under the lock so concurrent fetches of other URLs are not lost.
+        with self._index_lock:
+            index = self._load_index()
+            index[url] = entry
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".json")
+            with os.fdopen(fd, "w") as fh:
+                json.dump(index, fh, indent=2)
+            os.replace(tmp, self._index_path)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "objects", f"{digest}.json.zst")
+
+    def _usable_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        """The index entry for ``url`` if its blob is still in the object store."""
+        entry = self._load_index().get(url)
+        return entry if entry and os.path.exists(self.blob_path(entry["sha256"])) else None
+
+    def fetch(self, url: str) -> Dict[str, Any]:
+        """
+        Make sure ``url`` is cached and return its index entry
+        (``sha256``, ``etag``, ``last_modified``, ``checked``).
+        """
+        entry = self._usable_entry(url)
+        if entry is not None:
+            if self.offline or time.time() - entry["checked"] < self.max_age:
+                return entry
+        elif self.offline:
+            raise FileNotFoundError(f"Offline mode: no cached bundle for {url}")
+
+        headers: Dict[str, str] = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        with self.session.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 304 and entry is not None:
+                entry["checked"] = time.time()
+            else:
+                response.raise_for_status()
+                entry = {
+                    "sha256": self._store(response),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "checked": time.time(),
+                }
+        self._save_entry(url, entry)
+        return entry
+
+    def _store(self, response: requests.Response) -> str:
+        """Compress the body into the object store while hashing it; returns the digest."""
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.cache_dir, "objects"), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                with zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(fh) as writer:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        digest.update(chunk)
+                        writer.write(chunk)
+            os.replace(tmp, self.blob_path(digest.hexdigest()))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return digest.hexdigest()
+
+    def digests(self, urls: Iterable[str]) -> Dict[str, Optional[str]]:
+        """sha256 of the current bundle per URL, revalidated as by fetch(); None where it can't be fetched."""
+        digests: Dict[str, Optional[str]] = {}
+        for url in urls:
+            try:
+                digests[url] = self.fetch(url)["sha256"]
+            except (requests.RequestException, OSError):
+                digests[url] = None
+        return digests
+
+    def path(self, url: str) -> str:
+        """Return the path of the cached, zstd-compressed bundle for ``url``."""
+        return self.blob_path(self.fetch(url)["sha256"])
+
+    def open(self, url: str) -> IO[bytes]:
+        """Open the (decompressed) bundle for ``url``, fetching or revalidating it first."""
+        return open_bundle(self.path(url))
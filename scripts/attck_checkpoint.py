@@ -0,0 +1,101 @@
+"""
+Resumable pushes.
+
+A push writes its statements in stages (e.g. nodes per label, then edges) of
+numbered batches. After the database commits a batch, the push records it in a
+small JSON checkpoint file. If the push dies partway through, a resumed run over
+the same ATT&CK content skips every batch the checkpoint marks as committed:
+
+    checkpoint = Checkpoint.open(path, content_hash(versions), resume=True)
+    for index, batch in checkpoint.pending("nodes:GPO", batches):
+        write(batch)                       # must be committed before ...
+        checkpoint.commit("nodes:GPO", index)
+    checkpoint.finish()                    # push complete, drop the file
+
+Batches must come out in the same order on every run over the same content,
+which holds for the pushers since they follow the bundle order. The checkpoint
+is keyed by a hash of the parsed content (STIX id and modified timestamp of every
+object), so a checkpoint left by a different release is ignored rather than
+resumed. A Checkpoint without a path records nothing and skips nothing.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+
+from attck_delta import Versions
+
+T = TypeVar("T")
+
+
+def content_hash(versions: Versions) -> str:
+    """sha256 over the (STIX id, modified, retired) triples of a parsed bundle, see attck_delta.model_versions()."""
+    digest = hashlib.sha256()
+    for stix in sorted(versions):
+        modified, retired = versions[stix]
+        digest.update(f"{stix}\0{modified}\0{int(retired)}\n".encode())
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Committed batch counts per stage of one push, durably mirrored to ``path``."""
+
+    def __init__(self, path: Optional[str], bundle_hash: str, stages: Optional[Dict[str, int]] = None):
+        self.path = path
+        self.bundle_hash = bundle_hash
+        self.stages: Dict[str, int] = stages or {}
+
+    @classmethod
+    def open(cls, path: Optional[str], bundle_hash: str, resume: bool = False) -> "Checkpoint":
+        """With ``resume``, continue from ``path`` if it was written for the same content; otherwise start over."""
+        if path and resume:
+            try:
+                with open(path) as fh:
+                    data = json.load(fh)
+            except FileNotFoundError:
+                data = None
+            if data and data.get("bundle_hash") == bundle_hash:
+                return cls(path, bundle_hash, data.get("stages"))
+        return cls(path, bundle_hash)
+
+    @property
+    def resumed(self) -> bool:
+        return bool(self.stages)
+
+    def committed(self, stage: str) -> int:
+        """Number of leading batches of ``stage`` already committed."""
+        return self.stages.get(stage, 0)
+
+    def pending(self, stage: str, batches: Iterable[T]) -> Iterator[Tuple[int, T]]:
+        """(index, batch) for the batches of ``stage`` not committed yet."""
+        done = self.committed(stage)
+        for index, batch in enumerate(batches):
+            if index >= done:
+                yield index, batch
+
+    def commit(self, stage: str, index: int) -> None:
+        """Record batch ``index`` of ``stage`` (and every batch before it) as committed."""
+        self.stages[stage] = index + 1
+        self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+        with os.fdopen(fd, "w") as fh:
+            json.dump({"bundle_hash": self.bundle_hash, "stages": self.stages}, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+
+    def finish(self) -> None:
+        """The push completed: nothing left to resume."""
+        self.stages = {}
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
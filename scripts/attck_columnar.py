@@ -0,0 +1,175 @@
+"""
+Columnar (Polars) representation of the parsed ATT&CK knowledge base.
+
+One DataFrame per object kind - ``tactics``, ``techniques``, ``software``,
+``groups`` and ``relationships`` - mirroring the dataclasses in
+ATTCKnowledge-push.py. Multi-valued fields (platforms, tactics, aliases, ...)
+are list columns, the relationship table keeps its STIX ids and edge type as
+categoricals, and the free-form fields whose shape varies between objects
+(``reference``, ``network``, ``remote``, ``prereq``) are stored as JSON text.
+
+Rows are accumulated in small chunks while parsing, so a knowledge base can be
+built straight from a streamed bundle without ever holding the dataclasses.
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import polars as pl
+
+LIST_STR = pl.List(pl.String)
+
+# Fields whose values are not a fixed type across ATT&CK releases (dicts, bools, lists of strings).
+JSON_COLUMNS = ("reference", "network", "remote", "prereq")
+
+_COMMON = {
+    "id": pl.String,
+    "wiki": pl.String,
+    "reference": pl.String,
+    "created": pl.String,
+    "modified": pl.String,
+    "contributor": LIST_STR,
+    "stix": pl.String,
+    "retired": pl.Boolean,
+}
+
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "tactics": {"name": pl.String, "description": pl.String, "type": LIST_STR, "shortname": pl.String, **_COMMON},
+    "techniques": {
+        "name": pl.String,
+        "tactic": LIST_STR,
+        "description": pl.String,
+        "platform": LIST_STR,
+        "permission": LIST_STR,
+        "bypass": LIST_STR,
+        "effective_perm": LIST_STR,
+        "network": pl.String,
+        "remote": pl.String,
+        "prereq": pl.String,
+        "detection": pl.String,
+        "mitigation": pl.String,
+        "data_source": LIST_STR,
+        **_COMMON,
+    },
+    "software": {"name": pl.String, "description": pl.String, "type": pl.String, "alias": LIST_STR, **_COMMON},
+    "groups": {"name": pl.String, "description": pl.String, "alias": LIST_STR, **_COMMON},
+    "relationships": {
+        "source": pl.String,
+        "edge": pl.String,
+        "target": pl.String,
+        "description": pl.String,
+        "reference": pl.String,
+        "stix": pl.String,
+        "modified": pl.String,
+        "retired": pl.Boolean,
+    },
+}
+
+# Low-cardinality, highly repeated columns: stored dictionary-encoded.
+CATEGORICAL_COLUMNS = {
+    "relationships": ("source", "edge", "target"),
+    "software": ("type",),
+}
+
+DEFAULT_CHUNK_ROWS = 10_000
+
+
+class FrameBuilder:
+    """Accumulates row dicts for one kind and flushes them into DataFrame chunks."""
+
+    def __init__(self, kind: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.kind = kind
+        self.schema = SCHEMAS[kind]
+        self.chunk_rows = chunk_rows
+        self._rows: List[Dict[str, Any]] = []
+        self._chunks: List[pl.DataFrame] = []
+
+    def append(self, row: Dict[str, Any]):
+        encoded = {}
+        for column in self.schema:
+            value = row.get(column)
+            encoded[column] = json.dumps(value) if column in JSON_COLUMNS else value
+        self._rows.append(encoded)
+        if len(self._rows) >= self.chunk_rows:
+            self._flush()
+
+    def extend(self, rows: Iterable[Dict[str, Any]]):
+        for row in rows:
+            self.append(row)
+
+    def _flush(self):
+        if self._rows:
+            self._chunks.append(pl.DataFrame(self._rows, schema=self.schema))
+            self._rows = []
+
+    def finish(self) -> pl.DataFrame:
+        self._flush()
+        frame = pl.concat(self._chunks) if self._chunks else pl.DataFrame(schema=self.schema)
+        categoricals = CATEGORICAL_COLUMNS.get(self.kind, ())
+        return frame.with_columns([pl.col(c).cast(pl.Categorical) for c in categoricals])
+
+
+class ATTCKFrames:
+    """Per-kind Polars frames for an ATT&CK knowledge base."""
+
+    KINDS = tuple(SCHEMAS)
+
+    def __init__(self, frames: Dict[str, pl.DataFrame]):
+        self.frames = {kind: frames[kind] if kind in frames else FrameBuilder(kind).finish() for kind in self.KINDS}
+
+    @classmethod
+    def from_records(cls, records: Dict[str, Iterable[Dict[str, Any]]],
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS) -> "ATTCKFrames":
+        """Build frames from row dicts (e.g. ``map(asdict, knowledge.techniques)``) keyed by kind."""
+        frames = {}
+        for kind, rows in records.items():
+            builder = FrameBuilder(kind, chunk_rows)
+            builder.extend(rows)
+            frames[kind] = builder.finish()
+        return cls(frames)
+
+    @property
+    def tactics(self) -> pl.DataFrame:
+        return self.frames["tactics"]
+
+    @property
+    def techniques(self) -> pl.DataFrame:
+        return self.frames["techniques"]
+
+    @property
+    def software(self) -> pl.DataFrame:
+        return self.frames["software"]
+
+    @property
+    def groups(self) -> pl.DataFrame:
+        return self.frames["groups"]
+
+    @property
+    def relationships(self) -> pl.DataFrame:
+        return self.frames["relationships"]
+
+    def edges(self) -> pl.DataFrame:
+        """The compact (source, edge, target) relationship table."""
+        return self.relationships.select("source", "edge", "target")
+
+    def records(self, kind: str, frame: Optional[pl.DataFrame] = None) -> Iterator[Dict[str, Any]]:
+        """Yield plain row dicts with JSON columns decoded, ready for ``ATTCKTechnique(**row)``."""
+        frame = self.frames[kind] if frame is None else frame
+        json_columns = [c for c in JSON_COLUMNS if c in frame.columns]
+        for row in frame.iter_rows(named=True):
+            for column in json_columns:
+                row[column] = json.loads(row[column])
+            yield row
+
+    def techniques_for_platform(self, platform: str) -> pl.DataFrame:
+        return self.techniques.filter(pl.col("platform").list.contains(platform))
+
+    def techniques_for_tactic(self, tactic: str) -> pl.DataFrame:
+        return self.techniques.filter(pl.col("tactic").list.contains(tactic))
+
+    def groups_with_alias(self, alias: str) -> pl.DataFrame:
+        return self.groups.filter(pl.col("alias").list.contains(alias))
+
+    def estimated_size(self) -> int:
+        """Approximate in-memory size of all frames, in bytes."""
+        return sum(frame.estimated_size() for frame in self.frames.values())
@@ -0,0 +1,126 @@
+"""
+Delta pushes between ATT&CK releases.
+
+A push records, per STIX id, the ``modified`` timestamp it wrote and where the
+object landed in the graph (node label/key, or the edge endpoints). The next
+push diffs the freshly parsed bundle against that state:
+
+    create  - STIX id not pushed before
+    update  - pushed before with a different ``modified`` timestamp
+    delete  - pushed before, and now missing, revoked or deprecated
+
+so a routine refresh only touches the handful of objects MITRE changed.
+"""
+
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+# STIX id -> (modified, retired)
+Versions = Dict[str, Tuple[str, bool]]
+
+
+def is_retired(obj: Dict[str, Any]) -> bool:
+    """True for revoked and deprecated STIX objects; a delta push removes them from the graph."""
+    return bool(obj.get("revoked") or obj.get("x_mitre_deprecated"))
+
+
+def model_versions(objects: Iterable[Any], stix: str = "stix", modified: str = "modified",
+                   retired: str = "retired") -> Versions:
+    """Versions of parsed model objects, read from the given attribute names."""
+    versions = {}
+    for obj in objects:
+        stix_id = getattr(obj, stix, None)
+        if stix_id:
+            versions[stix_id] = (getattr(obj, modified, None) or "", bool(getattr(obj, retired, False)))
+    return versions
+
+
+@dataclass
+class Delta:
+    create: Set[str] = field(default_factory=set)
+    update: Set[str] = field(default_factory=set)
+    delete: Set[str] = field(default_factory=set)
+
+    @property
+    def upserts(self) -> Set[str]:
+        return self.create | self.update
+
+    def summary(self) -> str:
+        return f"{len(self.create)} created, {len(self.update)} updated, {len(self.delete)} deleted"
+
+
+class PushState:
+    """What the previous push wrote, keyed by STIX id."""
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+
+    @classmethod
+    def load(cls, path: str) -> "PushState":
+        try:
+            with open(path) as fh:
+                return cls(json.load(fh)["entries"])
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+        with os.fdopen(fd, "w") as fh:
+            json.dump({"entries": self.entries}, fh)
+        os.replace(tmp, path)
+
+    def add_node(self, stix: str, modified: str, label: str, key: Any) -> None:
+        self.entries[stix] = {"modified": modified, "label": label, "key": key}
+
+    def add_edge(self, stix: str, modified: str, src_label: str, src_key: Any, rel: str,
+                 tgt_label: str, tgt_key: Any) -> None:
+        self.entries[stix] = {"modified": modified, "edge": [src_label, src_key, rel, tgt_label, tgt_key]}
+
+    def diff(self, current: Versions) -> Delta:
+        """Compare the parsed bundle's versions against what was pushed last time."""
+        delta = Delta()
+        for stix, (modified, retired) in current.items():
+            previous = self.entries.get(stix)
+            if retired:
+                if previous is not None:
+                    delta.delete.add(stix)
+            elif previous is None:
+                delta.create.add(stix)
+            elif previous["modified"] != modified:
+                delta.update.add(stix)
+        delta.delete.update(stix for stix in self.entries if stix not in current)
+        return delta
+
+    def retractions(self, delta: Delta) -> Set[str]:
+        """Entries to remove before upserting: deleted objects, plus the old edge of every updated relationship."""
+        return delta.delete | {stix for stix in delta.update if "edge" in self.entries.get(stix, {})}
+
+
+def delete_statements(state: PushState, stix_ids: Iterable[str],
+                      key_property: str = "id") -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Cypher (query, params) pairs removing the nodes/edges previously written for ``stix_ids``. Edges are
+    matched by their endpoints, so an edge another remaining entry also maps to (e.g. two STIX relationships
+    pushed as the same USES edge) is left in place.
+    """
+    stix_ids = set(stix_ids)
+    live_edges = {tuple(entry["edge"]) for stix, entry in state.entries.items()
+                  if "edge" in entry and stix not in stix_ids}
+    for stix in stix_ids:
+        entry = state.entries.get(stix)
+        if entry is None:
+            continue
+        if "edge" in entry:
+            edge = tuple(entry["edge"])
+            if edge in live_edges:
+                continue
+            live_edges.add(edge)  # one DELETE per edge, however many retracted entries map to it
+            src_label, src_key, rel, tgt_label, tgt_key = edge
+            yield (f"MATCH (a:{src_label} {{{key_property}: $src}})-[r:{rel}]->(b:{tgt_label} {{{key_property}: $tgt}}) "
+                   f"DELETE r", {"src": src_key, "tgt": tgt_key})
+        else:
+            yield (f"MATCH (n:{entry['label']} {{{key_property}: $key}}) DETACH DELETE n", {"key": entry["key"]})
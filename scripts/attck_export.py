@@ -0,0 +1,170 @@
+"""
+Offline ``neo4j-admin database import`` files for a parsed ATT&CK knowledge base.
+
+Building a fresh graph through transactional MERGEs, however batched, is far
+slower than the offline importer, which writes the store files directly. This
+module writes the header-annotated CSV layout the importer reads, one gzipped
+node file per label plus one relationship file:
+
+    export = export_import_files(attck, "import/attck", mapping="bloodhound")
+    print(export.command("neo4j"))
+    # neo4j-admin database import full neo4j --nodes=GPO=import/attck/GPO.csv.gz ... --multiline-fields=true
+
+Nodes are identified by STIX id (``stix:ID(ATTCK)``, also stored as the ``stix``
+property). Relationships can refer to them without a lookup that way. Every
+model field becomes a typed property column. String lists become ``string[]``
+columns, booleans become ``boolean`` columns, and anything else, such as the
+external references, is written as JSON. Revoked and deprecated objects are
+left out, and so are relationships whose endpoints were not exported, because
+the importer rejects dangling relationships.
+"""
+
+import csv
+import gzip
+import json
+import os
+from dataclasses import dataclass, field, fields
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from attck_index import ATTCKIndex
+
+ID_SPACE = "ATTCK"
+ARRAY_DELIMITER = ";"
+
+
+class LabelMapping(NamedTuple):
+    labels: Dict[str, str]  # ATTCKnowledge attribute -> node label
+    tactic_first: bool  # direction of the tactic/technique USES edge
+
+
+# The labels the pushers write: BloodHound's (ATTCKnowledge-push.py) and ATT&CK's own (mitre-bloodhound-test2.py)
+LABEL_MAPPINGS = {
+    "bloodhound": LabelMapping({"tactics": "OU", "techniques": "GPO", "software": "Computer", "groups": "Group"},
+                               tactic_first=False),
+    "attck": LabelMapping({"tactics": "Tactic", "techniques": "Technique", "software": "Software", "groups": "Group"},
+                          tactic_first=True),
+}
+
+
+@dataclass
+class ImportExport:
+    """The files written by export_import_files() and the row counts in each."""
+
+    directory: str
+    nodes: Dict[str, str] = field(default_factory=dict)  # label -> path
+    relationships: List[str] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)  # path -> rows
+
+    def command(self, database: str = "neo4j") -> str:
+        args = [f"neo4j-admin database import full {database}"]
+        args.extend(f"--nodes={label}={path}" for label, path in self.nodes.items())
+        args.extend(f"--relationships={path}" for path in self.relationships)
+        args.append(f"--array-delimiter='{ARRAY_DELIMITER}' --multiline-fields=true")
+        return " ".join(args)
+
+
+def relationship_type(edge: str) -> str:
+    return edge.upper().replace("-", "_")
+
+
+def property_columns(obj: Any) -> List[Tuple[str, str]]:
+    """(field name, header) for every dataclass field of ``obj``; ``stix`` becomes the node ID column."""
+    columns = []
+    for f in fields(obj):
+        if f.name == "stix":
+            header = f"stix:ID({ID_SPACE})"
+        elif f.type is bool:
+            header = f"{f.name}:boolean"
+        elif f.type == List[str]:
+            header = f"{f.name}:string[]"
+        else:
+            header = f.name
+        columns.append((f.name, header))
+    return columns
+
+
+def csv_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return ARRAY_DELIMITER.join(value)
+    return json.dumps(value)
+
+
+def _open(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def write_nodes(path: str, objects: Iterable[Any]) -> int:
+    """One node CSV (header row included) for same-typed model objects; returns the rows written."""
+    rows = 0
+    columns: Optional[List[Tuple[str, str]]] = None
+    with _open(path) as fh:
+        writer = csv.writer(fh)
+        for obj in objects:
+            if columns is None:
+                columns = property_columns(obj)
+                writer.writerow(header for _, header in columns)
+            writer.writerow(csv_value(getattr(obj, name)) for name, _ in columns)
+            rows += 1
+    return rows
+
+
+def write_relationships(path: str, edges: Iterable[Tuple[str, str, str]]) -> int:
+    """(start stix id, TYPE, end stix id) rows; returns the rows written."""
+    rows = 0
+    with _open(path) as fh:
+        writer = csv.writer(fh)
+        writer.writerow([f":START_ID({ID_SPACE})", ":TYPE", f":END_ID({ID_SPACE})"])
+        for start, rel_type, end in edges:
+            writer.writerow([start, rel_type, end])
+            rows += 1
+    return rows
+
+
+def live(objects: Iterable[Any]) -> Iterator[Any]:
+    return (obj for obj in objects if obj.stix and not obj.retired)
+
+
+def export_import_files(attck: Any, directory: str, mapping: str = "bloodhound", compress: bool = True,
+                        index: Optional[ATTCKIndex] = None) -> ImportExport:
+    """
+    Write ``attck`` (an ATTCKnowledge, or anything with its tactics/techniques/software/groups/relationships
+    lists) as neo4j-admin import files under ``directory``, labelled per ``LABEL_MAPPINGS[mapping]``.
+    """
+    labels, tactic_first = LABEL_MAPPINGS[mapping]
+    index = index or ATTCKIndex.build(attck.tactics, [])
+    suffix = ".csv.gz" if compress else ".csv"
+    os.makedirs(directory, exist_ok=True)
+    export = ImportExport(directory)
+
+    exported = set()
+    for kind, label in labels.items():
+        path = os.path.join(directory, f"{label}{suffix}")
+        objects = list(live(getattr(attck, kind)))
+        exported.update(obj.stix for obj in objects)
+        export.counts[path] = write_nodes(path, objects)
+        if objects:
+            export.nodes[label] = path
+
+    def edges() -> Iterator[Tuple[str, str, str]]:
+        # Kill chain phase names are tactic shortnames
+        for technique in live(attck.techniques):
+            for phase_name in technique.tactic:
+                tactic = index.tactic(phase_name)
+                if tactic is not None and tactic.stix in exported:
+                    yield (tactic.stix, "USES", technique.stix) if tactic_first else (technique.stix, "USES", tactic.stix)
+        for rel in live(attck.relationships):
+            if rel.source in exported and rel.target in exported:
+                yield rel.source, relationship_type(rel.edge), rel.target
+
+    path = os.path.join(directory, f"relationships{suffix}")
+    export.counts[path] = write_relationships(path, edges())
+    export.relationships.append(path)
+    return export
@@ -0,0 +1,135 @@
+"""
+Constant-time lookups over a parsed ATT&CK knowledge base.
+
+The parsers in this folder produce flat lists of model objects, while STIX
+relationships and technique kill chain phases refer to other objects by STIX id
+and tactic shortname. ``ATTCKIndex`` hashes every object once so consumers can
+resolve those references with a dict lookup instead of scanning the lists:
+
+    index = ATTCKIndex.build(tactics, [*techniques, *groups, *software, *relationships])
+    index.get("attack-pattern--...")      # STIX id -> object
+    index.external("T1003")               # ATT&CK id -> object
+    index.tactic("credential-access")     # kill chain phase_name -> tactic
+
+``EndpointResolver`` turns those lookups into the (label, key) endpoints the
+pushers MATCH relationships on, so every push path resolves relationship
+endpoints in linear time overall.
+
+Attribute names are configurable because the scripts use different model
+classes (``stix``/``id``/``shortname`` on the dataclasses, ``STIX``/``ID``/
+``ShortName`` on the PowerShell ports). When several domains are indexed
+together the first object seen wins, matching the order the domains were parsed.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+
+class ATTCKIndex:
+    """STIX id, external id and tactic shortname lookups over model objects."""
+
+    def __init__(self, stix: str = "stix", external_id: str = "id", shortname: str = "shortname",
+                 domain: Optional[str] = None):
+        self._stix = stix
+        self._external_id = external_id
+        self._shortname = shortname
+        self._domain = domain
+        self.by_stix: Dict[str, Any] = {}
+        self.by_external_id: Dict[str, Any] = {}
+        self.by_shortname: Dict[str, Any] = {}
+        self.by_domain_shortname: Dict[Tuple[str, str], Any] = {}
+
+    @classmethod
+    def build(cls, tactics: Iterable[Any], objects: Iterable[Any], **attrs: Any) -> "ATTCKIndex":
+        index = cls(**attrs)
+        for tactic in tactics:
+            index.add_tactic(tactic)
+        for obj in objects:
+            index.add(obj)
+        return index
+
+    def add(self, obj: Any):
+        stix_id = getattr(obj, self._stix, None)
+        if stix_id:
+            self.by_stix.setdefault(stix_id, obj)
+        external_id = getattr(obj, self._external_id, None)
+        if external_id:
+            self.by_external_id.setdefault(external_id, obj)
+
+    def add_tactic(self, tactic: Any):
+        self.add(tactic)
+        shortname = getattr(tactic, self._shortname, None)
+        if not shortname:
+            return
+        self.by_shortname.setdefault(shortname, tactic)
+        for domain in self._domains(tactic):
+            self.by_domain_shortname.setdefault((domain, shortname), tactic)
+
+    def _domains(self, tactic: Any) -> Iterator[str]:
+        value = getattr(tactic, self._domain, None) if self._domain else None
+        if isinstance(value, str):
+            yield value
+        elif value:
+            yield from value
+
+    def get(self, stix_id: Optional[str]) -> Optional[Any]:
+        return self.by_stix.get(stix_id) if stix_id else None
+
+    def external(self, external_id: Optional[str]) -> Optional[Any]:
+        return self.by_external_id.get(external_id) if external_id else None
+
+    def tactic(self, shortname: Optional[str], domain: Optional[str] = None) -> Optional[Any]:
+        """The tactic for a kill chain ``phase_name``; ``domain`` picks between same-named tactics of other matrices."""
+        if domain is not None:
+            tactic = self.by_domain_shortname.get((domain, shortname))
+            if tactic is not None:
+                return tactic
+        return self.by_shortname.get(shortname) if shortname else None
+
+    def __contains__(self, stix_id: str) -> bool:
+        return stix_id in self.by_stix
+
+    def __len__(self) -> int:
+        return len(self.by_stix)
+
+
+# (node label, node key) of a relationship endpoint in the graph
+Endpoint = Tuple[str, Any]
+
+
+def stix_type(stix_id: Optional[str]) -> str:
+    """``attack-pattern`` for ``attack-pattern--<uuid>``."""
+    return (stix_id or "").split("--", 1)[0]
+
+
+class EndpointResolver:
+    """
+    Graph endpoints for STIX ids and kill chain phases, resolved with dict lookups over an ``ATTCKIndex``.
+    The label comes from the STIX type (``labels`` maps e.g. ``attack-pattern`` to ``GPO``), the key from
+    the object's ``key`` attribute, i.e. the property the pusher MERGEs nodes on. Objects missing from the
+    index keep their STIX id as key.
+    """
+
+    TACTIC_TYPE = "x-mitre-tactic"
+
+    def __init__(self, index: ATTCKIndex, labels: Dict[str, str], key: str = "id"):
+        self.index = index
+        self.labels = labels
+        self.key = key
+
+    def label(self, stix_id: Optional[str]) -> Optional[str]:
+        return self.labels.get(stix_type(stix_id))
+
+    def resolve(self, stix_id: Optional[str]) -> Optional[Endpoint]:
+        """(label, key) for ``stix_id``; None for object types that have no node label."""
+        label = self.label(stix_id)
+        if label is None:
+            return None
+        obj = self.index.get(stix_id)
+        return label, (getattr(obj, self.key, None) if obj is not None else None) or stix_id
+
+    def tactic(self, phase_name: Optional[str], domain: Optional[str] = None) -> Optional[Endpoint]:
+        """(label, key) of the tactic a kill chain ``phase_name`` (its shortname) refers to."""
+        label = self.labels.get(self.TACTIC_TYPE)
+        tactic = self.index.tactic(phase_name, domain)
+        key = getattr(tactic, self.key, None) if tactic is not None else None
+        return (label, key) if label and key else None
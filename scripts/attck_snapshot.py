@@ -0,0 +1,230 @@
+"""
+Binary snapshots of a parsed ATT&CK knowledge base.
+
+A snapshot is a directory of Arrow IPC files plus a versioned manifest:
+
+    manifest.json            schema_version, tables, column layout, free-form meta
+    <table>.arrow            identity columns (id, name, stix, tactic, ...), uncompressed
+                             so Polars memory-maps it instead of reading it
+    <table>.bulk.arrow       bulky text (description, reference, ...), zstd-compressed,
+                             only read the first time one of its values is touched
+
+Objects loaded back from a snapshot are instances of a lazy subclass of the
+original model class: light attributes are set up front, bulky ones are fetched
+and decoded from the bulk file on first access. Downstream scripts can therefore
+start from a snapshot in milliseconds instead of re-fetching and re-parsing the
+bundles.
+
+Each script stores its own model tables, so ``meta["kind"]`` records which
+script wrote a snapshot, and ``meta["bundles"]`` the sha256 of every source
+bundle (see ``BundleCache.digests()``). A script reuses a snapshot only while
+both still match:
+
+    bundles = cache.digests(urls)
+    if snapshot_is_current(path, SNAPSHOT_KIND, bundles):
+        knowledge = ATTCKnowledge.load(path)     # Snapshot(path, kind=SNAPSHOT_KIND)
+    else:
+        ...                                      # sync, then save(path, meta={"bundles": bundles})
+"""
+
+import dataclasses
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+import polars as pl
+
+SCHEMA_VERSION = 1
+MANIFEST = "manifest.json"
+
+# Attribute names (across the different ATT&CK models in scripts/) that hold long free text
+# or nested reference structures.
+BULKY_COLUMNS = frozenset({
+    "description", "reference", "detection", "mitigation",
+    "Description", "Reference",
+})
+
+_PRIVATE_PREFIX = "_snapshot"
+
+
+def object_row(obj: Any) -> Dict[str, Any]:
+    """Attribute dict of a model object (dataclass or plain class)."""
+    if dataclasses.is_dataclass(obj):
+        return {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+    row = {k: v for k, v in vars(obj).items() if not k.startswith(_PRIVATE_PREFIX)}
+    # Snapshot-loaded objects keep not-yet-decoded bulky attributes on their class.
+    for name, attr in vars(type(obj)).items():
+        if isinstance(attr, _LazyColumn) and name not in row:
+            row[name] = getattr(obj, name)
+    return row
+
+
+def _column_kind(values: List[Any]) -> str:
+    """'str' for optional strings, 'list' for optional lists of strings, 'json' for anything else."""
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, str) for v in present):
+        return "str"
+    if all(isinstance(v, list) and all(isinstance(i, str) for i in v) for v in present):
+        return "list"
+    return "json"
+
+
+def _build_frame(columns: Dict[str, List[Any]], kinds: Dict[str, str]) -> pl.DataFrame:
+    series = []
+    for name, values in columns.items():
+        kind = kinds[name]
+        if kind == "json":
+            series.append(pl.Series(name, [json.dumps(v) for v in values], dtype=pl.String))
+        elif kind == "list":
+            series.append(pl.Series(name, values, dtype=pl.List(pl.String)))
+        else:
+            series.append(pl.Series(name, values, dtype=pl.String))
+    return pl.DataFrame(series)
+
+
+def write_snapshot(path: str, tables: Dict[str, Iterable[Any]], meta: Optional[Dict[str, Any]] = None):
+    """Write ``{table name: model objects}`` to a snapshot directory at ``path``."""
+    os.makedirs(path, exist_ok=True)
+    manifest: Dict[str, Any] = {
+        "schema_version": SCHEMA_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "meta": meta or {},
+        "tables": {},
+    }
+    for table, objects in tables.items():
+        rows = [object_row(obj) for obj in objects]
+        names = list(rows[0]) if rows else []
+        columns = {name: [row.get(name) for row in rows] for name in names}
+        kinds = {name: _column_kind(values) for name, values in columns.items()}
+        light = [n for n in names if n not in BULKY_COLUMNS]
+        bulk = [n for n in names if n in BULKY_COLUMNS]
+        _build_frame({n: columns[n] for n in light}, kinds).write_ipc(
+            os.path.join(path, f"{table}.arrow"), compression="uncompressed")
+        _build_frame({n: columns[n] for n in bulk}, kinds).write_ipc(
+            os.path.join(path, f"{table}.bulk.arrow"), compression="zstd")
+        manifest["tables"][table] = {"rows": len(rows), "columns": names, "light": light, "bulk": bulk,
+                                     "json": [n for n in names if kinds[n] == "json"]}
+    # The manifest goes last so a half-written snapshot is never mistaken for a complete one.
+    tmp = os.path.join(path, MANIFEST + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+
+
+class _LazyColumn:
+    """
+    Non-data descriptor for a bulky attribute of a snapshot-loaded object: the first read
+    decodes the value from the bulk file and stores it on the instance, which then shadows
+    the descriptor.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, obj: Any, owner: Optional[type] = None) -> Any:
+        if obj is None:
+            return self
+        state = obj.__dict__
+        value = state["_snapshot"].value(state["_snapshot_table"], state["_snapshot_row"], self.name)
+        state[self.name] = value
+        return value
+
+
+def snapshot_is_current(path: Optional[str], kind: str, bundles: Dict[str, Optional[str]]) -> bool:
+    """
+    True if ``path`` holds a snapshot written by ``kind`` from the same bundles. A bundle whose digest is
+    unknown (None, e.g. the source is unreachable) doesn't make the snapshot stale.
+    """
+    if not path or not Snapshot.exists(path):
+        return False
+    try:
+        meta = Snapshot(path).meta
+    except ValueError:  # older schema version
+        return False
+    stored = meta.get("bundles") or {}
+    return meta.get("kind") == kind and all(digest is None or stored.get(url) == digest
+                                            for url, digest in bundles.items())
+
+
+class Snapshot:
+    """Read side of a snapshot directory; with ``kind``, only a snapshot written by that script is accepted."""
+
+    def __init__(self, path: str, kind: Optional[str] = None):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as fh:
+            self.manifest = json.load(fh)
+        version = self.manifest.get("schema_version")
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"Snapshot {path} has schema version {version}, expected {SCHEMA_VERSION}")
+        written_by = self.manifest.get("meta", {}).get("kind")
+        if kind is not None and written_by != kind:
+            raise ValueError(f"Snapshot {path} was written by {written_by or 'an unknown script'}, not {kind}")
+        self._light: Dict[str, pl.DataFrame] = {}
+        self._bulk: Dict[str, pl.DataFrame] = {}
+        self._lazy_classes: Dict[Any, type] = {}
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, MANIFEST))
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        return self.manifest["meta"]
+
+    @property
+    def tables(self) -> List[str]:
+        return list(self.manifest["tables"])
+
+    def bulk_columns(self, table: str) -> List[str]:
+        return self.manifest["tables"][table]["bulk"]
+
+    def frame(self, table: str) -> pl.DataFrame:
+        """Light columns of ``table`` (memory-mapped); JSON columns are left encoded."""
+        if table not in self._light:
+            self._light[table] = pl.read_ipc(os.path.join(self.path, f"{table}.arrow"))
+        return self._light[table]
+
+    def bulk_frame(self, table: str) -> pl.DataFrame:
+        """Bulky columns of ``table``; read and decompressed once, on first use."""
+        if table not in self._bulk:
+            self._bulk[table] = pl.read_ipc(os.path.join(self.path, f"{table}.bulk.arrow"))
+        return self._bulk[table]
+
+    def value(self, table: str, row: int, column: str) -> Any:
+        info = self.manifest["tables"][table]
+        frame = self.bulk_frame(table) if column in info["bulk"] else self.frame(table)
+        value = frame[column][row]
+        if column in info["json"]:
+            return json.loads(value)
+        return value.to_list() if isinstance(value, pl.Series) else value
+
+    def rows(self, table: str) -> Iterable[Dict[str, Any]]:
+        """Light attribute dicts, one per object, with JSON columns decoded."""
+        json_columns = set(self.manifest["tables"][table]["json"])
+        for row in self.frame(table).iter_rows(named=True):
+            for column in json_columns.intersection(row):
+                row[column] = json.loads(row[column])
+            yield row
+
+    def _lazy_class(self, table: str, cls: type) -> type:
+        key = (table, cls)
+        if key not in self._lazy_classes:
+            namespace: Dict[str, Any] = {name: _LazyColumn(name) for name in self.bulk_columns(table)}
+            namespace["__module__"] = cls.__module__
+            self._lazy_classes[key] = type(cls.__name__, (cls,), namespace)
+        return self._lazy_classes[key]
+
+    def load_objects(self, table: str, cls: Type[Any]) -> List[Any]:
+        """
+        Rebuild ``table`` as ``cls`` instances without calling ``__init__``; bulky attributes
+        are filled in from the bulk file when first read.
+        """
+        lazy_cls = self._lazy_class(table, cls)
+        objects = []
+        for index, row in enumerate(self.rows(table)):
+            obj = lazy_cls.__new__(lazy_cls)
+            obj.__dict__.update(row)
+            obj.__dict__.update(_snapshot=self, _snapshot_table=table, _snapshot_row=index)
+            objects.append(obj)
+        return objects
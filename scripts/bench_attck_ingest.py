@@ -0,0 +1,299 @@
+"""
+Ingest benchmark for the ATT&CK parse paths, on synthetic STIX bundles.
+
+Generates bundles with roughly the object mix of enterprise-attack.json
+(mostly relationships, then techniques, software, mitigations, groups, ...)
+at the requested sizes, then times each parse path against the local file -
+no network involved. Every measurement runs in a fresh interpreter so peak RSS
+(``ru_maxrss``) belongs to that parse alone.
+
+    python scripts/bench_attck_ingest.py --sizes 10000 100000 1000000 --out bench.json
+
+The JSON written to ``--out`` holds one entry per (case, size) with the wall
+times of every repeat, the best time, objects/s and peak RSS, so results from
+two runs can be diffed to spot regressions.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import IO, Any, Callable, Dict, List, Tuple
+
+import zstandard
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Approximate share of each STIX type in enterprise-attack.json (v15).
+OBJECT_MIX: List[Tuple[str, float]] = [
+    ("relationship", 0.70),
+    ("attack-pattern", 0.08),
+    ("malware", 0.07),
+    ("course-of-action", 0.03),
+    ("x-mitre-data-component", 0.02),
+    ("intrusion-set", 0.02),
+    ("campaign", 0.01),
+    ("tool", 0.01),
+    ("x-mitre-data-source", 0.003),
+    ("x-mitre-tactic", 0.001),
+    ("identity", 0.001),
+    ("marking-definition", 0.001),
+]
+
+PLATFORMS = ["Windows", "Linux", "macOS", "Network", "Containers", "IaaS", "SaaS", "Office 365", "Azure AD"]
+TACTICS = ["reconnaissance", "resource-development", "initial-access", "execution", "persistence",
+           "privilege-escalation", "defense-evasion", "credential-access", "discovery", "lateral-movement",
+           "collection", "command-and-control", "exfiltration", "impact"]
+ID_PREFIX = {"attack-pattern": "T", "intrusion-set": "G", "malware": "S", "tool": "S",
+             "course-of-action": "M", "x-mitre-tactic": "TA", "campaign": "C", "x-mitre-data-source": "DS"}
+RELATIONSHIP_TYPES = [("uses", 0.8), ("mitigates", 0.12), ("subtechnique-of", 0.05), ("revoked-by", 0.03)]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(("adversaries", "may", "use", "the", "system", "credentials", "to", "access",
+                                "network", "process", "[Example](https://attack.mitre.org)", "(Citation: Report)"))
+                    for _ in range(words))
+
+
+def _references(rng: random.Random, stix_type: str, index: int) -> List[Dict[str, Any]]:
+    refs = []
+    if stix_type in ID_PREFIX:
+        external_id = f"{ID_PREFIX[stix_type]}{index:04d}"
+        refs.append({"source_name": "mitre-attack", "external_id": external_id,
+                     "url": f"https://attack.mitre.org/{stix_type}/{external_id}"})
+    for n in range(rng.randint(0, 6)):
+        refs.append({"source_name": f"Report {index}-{n}", "url": f"https://example.com/{index}/{n}",
+                     "description": _text(rng, 8)})
+    return refs
+
+
+def synthetic_object(rng: random.Random, stix_type: str, index: int, ids: Dict[str, List[str]]) -> Dict[str, Any]:
+    stix_id = f"{stix_type}--{index:08x}-0000-4000-8000-{rng.getrandbits(48):012x}"
+    obj: Dict[str, Any] = {
+        "type": stix_type,
+        "spec_version": "2.1",
+        "id": stix_id,
+        "created": "2017-05-31T21:30:19.735Z",
+        "modified": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00.000Z",
+        "created_by_ref": "identity--c78cb6e5-0c4b-4611-8297-d1b8b55e40b5",
+        "object_marking_refs": ["marking-definition--fa42a846-8d90-4e51-bc29-71d5b4802168"],
+        "x_mitre_version": "1.0",
+    }
+    if stix_type == "relationship":
+        relationship_type = rng.choices([t for t, _ in RELATIONSHIP_TYPES], [w for _, w in RELATIONSHIP_TYPES])[0]
+        sources = ids["intrusion-set"] + ids["malware"] + ids["tool"] or ["intrusion-set--0"]
+        obj.update(relationship_type=relationship_type, source_ref=rng.choice(sources),
+                   target_ref=rng.choice(ids["attack-pattern"] or ["attack-pattern--0"]),
+                   description=_text(rng, rng.randint(5, 40)),
+                   external_references=_references(rng, stix_type, index))
+    else:
+        obj.update(name=f"{stix_type} {index}", description=_text(rng, rng.randint(20, 200)),
+                   external_references=_references(rng, stix_type, index))
+    if stix_type == "attack-pattern":
+        obj.update(kill_chain_phases=[{"kill_chain_name": "mitre-attack", "phase_name": t}
+                                      for t in rng.sample(TACTICS, rng.randint(1, 3))],
+                   x_mitre_platforms=rng.sample(PLATFORMS, rng.randint(1, 4)),
+                   x_mitre_detection=_text(rng, rng.randint(10, 80)),
+                   x_mitre_data_sources=[f"Process: Process Creation {n}" for n in range(rng.randint(0, 5))],
+                   x_mitre_is_subtechnique=rng.random() < 0.6)
+    elif stix_type == "x-mitre-tactic":
+        obj["x_mitre_shortname"] = TACTICS[index % len(TACTICS)]
+    elif stix_type == "intrusion-set":
+        obj["aliases"] = [obj["name"]] + [f"Alias {index}-{n}" for n in range(rng.randint(0, 4))]
+    elif stix_type in ("malware", "tool"):
+        obj["x_mitre_aliases"] = [obj["name"]]
+        obj["x_mitre_platforms"] = rng.sample(PLATFORMS, rng.randint(1, 3))
+    if stix_type != "relationship" and rng.random() < 0.03:
+        obj["x_mitre_deprecated"] = True
+    if stix_type in ids:
+        ids[stix_type].append(stix_id)
+    return obj
+
+
+def write_bundle(path: str, objects: int, seed: int = 0):
+    """Write a synthetic bundle of ``objects`` STIX objects to ``path`` (zstd if it ends in .zst), one at a time."""
+    rng = random.Random(seed)
+    types = [t for t, _ in OBJECT_MIX]
+    weights = [w for _, w in OBJECT_MIX]
+    ids: Dict[str, List[str]] = {"attack-pattern": [], "intrusion-set": [], "malware": [], "tool": []}
+    # Referenced kinds go first so relationships always have endpoints to point at.
+    head = [t for t in types if t in ids]
+    with open(path, "wb") as raw:
+        out: IO[bytes] = zstandard.ZstdCompressor().stream_writer(raw) if path.endswith(".zst") else raw
+        out.write(b'{"type": "bundle", "id": "bundle--00000000-0000-4000-8000-000000000000", "objects": [\n')
+        for index in range(objects):
+            stix_type = head[index] if index < len(head) else rng.choices(types, weights)[0]
+            if index:
+                out.write(b",\n")
+            out.write(json.dumps(synthetic_object(rng, stix_type, index, ids)).encode())
+        out.write(b"\n]}\n")
+        out.flush()
+        if out is not raw:
+            out.close()
+
+
+# --- Parse paths ---
+
+def _load_script(filename: str, name: str) -> Any:
+    """Import one of the hyphen-named scripts in this folder as a module (once per process)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _push_sync(path: str) -> int:
+    attck = _load_script("ATTCKnowledge-push.py", "attck_push").ATTCKnowledge()
+    attck.sync(bundle_path=path)
+    return sum(len(getattr(attck, kind)) for kind in ("tactics", "techniques", "software", "groups", "relationships"))
+
+
+def _push_json_load(path: str) -> int:
+    # The pre-streaming path: whole bundle through json.load, then the same parser.
+    from attck_cache import open_bundle
+    attck = _load_script("ATTCKnowledge-push.py", "attck_push").ATTCKnowledge()
+    with open_bundle(path) as fp:
+        attck.parse_objects(json.load(fp)["objects"])
+    return sum(len(getattr(attck, kind)) for kind in ("tactics", "techniques", "software", "groups", "relationships"))
+
+
+def _push_frames(path: str) -> int:
+    frames = _load_script("ATTCKnowledge-push.py", "attck_push").ATTCKnowledge.sync_frames(bundle_path=path)
+    return sum(frame.height for frame in frames.frames.values())
+
+
+def _test1_parse_domain(path: str) -> int:
+    from attck_bundle import iter_stream_objects
+    from attck_cache import open_bundle
+    module = _load_script("mitre-bloodhound-test1.py", "attck_test1")
+    with open_bundle(path) as fp:
+        parsed = module.parse_domain("Enterprise", iter_stream_objects(fp))
+    return sum(len(objects) for objects in parsed.values())
+
+
+def _test2_sync(path: str) -> int:
+    module = _load_script("mitre-bloodhound-test2.py", "attck_test2")
+    knowledge = module.ATTCKnowledge()
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            knowledge.sync(bundle_path=path)
+        finally:
+            sys.stdout = stdout
+    return sum(len(getattr(knowledge, kind)) for kind in ("tactic", "technique", "group", "software", "relationship"))
+
+
+# case -> (parse function, script it exercises); the script is imported before the clock starts.
+CASES: Dict[str, Tuple[Callable[[str], int], Tuple[str, str]]] = {
+    "push-sync": (_push_sync, ("ATTCKnowledge-push.py", "attck_push")),
+    "push-json-load": (_push_json_load, ("ATTCKnowledge-push.py", "attck_push")),
+    "push-frames": (_push_frames, ("ATTCKnowledge-push.py", "attck_push")),
+    "test1-parse-domain": (_test1_parse_domain, ("mitre-bloodhound-test1.py", "attck_test1")),
+    "test2-sync": (_test2_sync, ("mitre-bloodhound-test2.py", "attck_test2")),
+}
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(case: str, path: str) -> Dict[str, Any]:
+    """Run one parse path in this process; call from a fresh interpreter (see measure())."""
+    parse, script = CASES[case]
+    _load_script(*script)
+    baseline = _peak_rss_bytes()
+    start = time.perf_counter()
+    parsed = parse(path)
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "parsed": parsed, "peak_rss_bytes": _peak_rss_bytes(), "baseline_rss_bytes": baseline}
+
+
+def measure(case: str, path: str) -> Dict[str, Any]:
+    """Run ``case`` on ``path`` in a child interpreter and return its timing and peak RSS."""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", case, path],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def benchmark(sizes: List[int], cases: List[str], repeat: int, workdir: str, seed: int,
+              compress: bool) -> Dict[str, Any]:
+    results = []
+    for size in sizes:
+        path = os.path.join(workdir, f"synthetic-{size}-{seed}.json" + (".zst" if compress else ""))
+        if not os.path.exists(path):
+            print(f"[*] Generating {size} objects -> {path}", file=sys.stderr)
+            write_bundle(path, size, seed)
+        for case in cases:
+            runs = [measure(case, path) for _ in range(repeat)]
+            seconds = [run["seconds"] for run in runs]
+            best = min(seconds)
+            peak = max(run["peak_rss_bytes"] for run in runs)
+            results.append({
+                "case": case,
+                "objects": size,
+                "bundle_bytes": os.path.getsize(path),
+                "parsed": runs[0]["parsed"],
+                "seconds": seconds,
+                "best_seconds": best,
+                "objects_per_second": size / best if best else None,
+                "peak_rss_bytes": peak,
+                "baseline_rss_bytes": min(run["baseline_rss_bytes"] for run in runs),
+            })
+            print(f"[+] {case:20s} {size:>9d} objects  {best:8.3f}s  peak RSS {peak / 2**20:8.1f} MiB",
+                  file=sys.stderr)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "compressed": compress,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--zst", action="store_true", help="benchmark zstd-compressed bundles")
+    parser.add_argument("--workdir", help="where generated bundles are kept (default: a temporary directory)")
+    parser.add_argument("--out", help="write results JSON here (default: stdout)")
+    parser.add_argument("--worker", nargs=2, metavar=("CASE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_case(*args.worker)))
+        return
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        report = benchmark(args.sizes, args.cases, args.repeat, args.workdir, args.seed, args.zst)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            report = benchmark(args.sizes, args.cases, args.repeat, workdir, args.seed, args.zst)
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
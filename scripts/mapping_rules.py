@@ -0,0 +1,150 @@
+"""
+Declarative BloodHound -> MITRE ATT&CK mapping rules.
+
+Rules live in ``data/csvs/mitre_mapping_rules.csv``, one per row:
+
+    rule         unique name
+    pattern      Cypher MATCH pattern, e.g. (u:User)-[:HasSession]->(c:Computer)
+    predicate    optional WHERE expression over the pattern's variables
+    source       the pattern variable that gets the edges
+    techniques   ;-separated technique ids -> (source)-[:USES_TECHNIQUE]->(:Technique)
+    tactics      ;-separated tactic ids    -> (source)-[:USES_TACTIC]->(:Tactic)
+    requires     ;-separated stages that must run first (e.g. materialize_reachability)
+    description  what the rule captures
+
+compile_rules() merges every rule sharing a pattern into one ``RulePass``. The
+pass MATCHes the pattern once and writes the edges of all its rules from
+per-rule CALL subqueries, so each graph pattern is scanned once per run
+however many rules use it. Rules with the same predicate, source and edge type
+share a subquery, with their ids combined. The ids are query parameters, so the
+query text doesn't change when a rule's ids do:
+
+    query, params = rule_pass.query()   # ... WHERE mitre.id IN $ids_0 ..., {"ids_0": ["T1021"]}
+"""
+
+import csv
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "csvs",
+                                  "mitre_mapping_rules.csv")
+
+USES_TECHNIQUE = "USES_TECHNIQUE"
+USES_TACTIC = "USES_TACTIC"
+
+_VARIABLE = re.compile(r"[(\[]\s*([A-Za-z_]\w*)")
+_LABELLED = re.compile(r"\(\s*([A-Za-z_]\w*)\s*:\s*([A-Za-z_]\w*)")
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in (value or "").split(";") if item.strip()]
+
+
+def _squash(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+@dataclass
+class MappingRule:
+    name: str
+    pattern: str
+    predicate: str
+    source: str
+    techniques: List[str]
+    tactics: List[str]
+    requires: List[str] = field(default_factory=list)
+    description: str = ""
+
+    @classmethod
+    def from_row(cls, row: Dict[str, str]) -> "MappingRule":
+        return cls(name=row["rule"].strip(), pattern=_squash(row["pattern"]), predicate=_squash(row.get("predicate", "")),
+                   source=row["source"].strip(), techniques=_split(row.get("techniques", "")),
+                   tactics=_split(row.get("tactics", "")), requires=_split(row.get("requires", "")),
+                   description=(row.get("description") or "").strip())
+
+    def targets(self) -> List[Tuple[str, str, List[str]]]:
+        """(relationship type, MITRE label, ids) written by this rule."""
+        return [(rel_type, label, ids) for rel_type, label, ids in
+                ((USES_TECHNIQUE, "Technique", self.techniques), (USES_TACTIC, "Tactic", self.tactics)) if ids]
+
+
+@dataclass
+class RulePass:
+    """Every rule MATCHing one pattern, compiled into a single statement."""
+
+    pattern: str
+    rules: List[MappingRule] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return "+".join(rule.name for rule in self.rules)
+
+    @property
+    def requires(self) -> List[str]:
+        return list(dict.fromkeys(stage for rule in self.rules for stage in rule.requires))
+
+    def variables(self) -> List[str]:
+        return list(dict.fromkeys(_VARIABLE.findall(self.pattern)))
+
+    def labels(self) -> Dict[str, str]:
+        """Node variable -> label, for the pattern's labelled node variables."""
+        return dict(_LABELLED.findall(self.pattern))
+
+    def edge_sources(self) -> List[Tuple[str, Optional[str]]]:
+        """(relationship type, source label) pairs the pass writes; None where the source is unlabelled."""
+        labels = self.labels()
+        return list(dict.fromkeys((rel_type, labels.get(source)) for _, source, rel_type, _, _ in self.writes()))
+
+    def writes(self) -> List[Tuple[str, str, str, str, List[str]]]:
+        """(predicate, source, relationship type, label, ids) per subquery, ids merged across rules."""
+        merged: Dict[Tuple[str, str, str, str], List[str]] = {}
+        for rule in self.rules:
+            for rel_type, label, ids in rule.targets():
+                target = merged.setdefault((rule.predicate, rule.source, rel_type, label), [])
+                target.extend(mitre_id for mitre_id in ids if mitre_id not in target)
+        return [(*key, ids) for key, ids in merged.items()]
+
+    def sources(self) -> List[str]:
+        """The variables that get edges, in order of first use."""
+        return list(dict.fromkeys(source for _, source, _, _, _ in self.writes()))
+
+    def query(self) -> Tuple[str, Dict[str, List[str]]]:
+        """
+        The pass as (Cypher, parameters), the MITRE ids of subquery n in ``$ids_<n>``. It returns the
+        name of every source node per matched row; run_rule() swaps that for a count outside debug mode.
+        """
+        variables = ", ".join(self.variables())
+        predicates = list(dict.fromkeys(rule.predicate for rule in self.rules))
+        lines = [f"MATCH {self.pattern}"]
+        if len(predicates) == 1 and predicates[0]:
+            # Shared by every rule: filter once, in the scan itself
+            lines.append(f"WHERE {predicates[0]}")
+        elif all(predicates):
+            lines.append("WHERE " + " OR ".join(f"({predicate})" for predicate in predicates))
+        params: Dict[str, List[str]] = {}
+        for n, (predicate, source, rel_type, label, ids) in enumerate(self.writes()):
+            params[f"ids_{n}"] = ids
+            lines.append("CALL {")
+            lines.append(f"    WITH {variables}")
+            if predicate and len(predicates) > 1:
+                lines.append(f"    WITH {variables} WHERE {predicate}")
+            lines.append(f"    MATCH (mitre:{label}) WHERE mitre.id IN $ids_{n}")
+            lines.append(f"    MERGE ({source})-[:{rel_type}]->(mitre)")
+            lines.append("}")
+        lines.append("RETURN " + ", ".join(f"{source}.name AS {source}" for source in self.sources()))
+        return "\n".join(lines), params
+
+
+def load_rules(path: str = DEFAULT_RULES_PATH) -> List[MappingRule]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        return [MappingRule.from_row(row) for row in csv.DictReader(fh) if (row.get("rule") or "").strip()]
+
+
+def compile_rules(rules: List[MappingRule]) -> List[RulePass]:
+    """One RulePass per distinct pattern, in order of first use."""
+    passes: Dict[str, RulePass] = {}
+    for rule in rules:
+        passes.setdefault(rule.pattern, RulePass(rule.pattern)).rules.append(rule)
+    return list(passes.values())
@@ -1,9 +1,15 @@
-from neo4j import GraphDatabase
-from typing import Dict, List
+from neo4j import AsyncGraphDatabase
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple, Union
 import asyncio
 from dataclasses import dataclass
 from datetime import datetime
 
+# Items for the bulk API may come from a plain or an async iterable (e.g. an async LDAP/API reader).
+Items = Union[Iterable[Any], AsyncIterable[Any]]
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CONCURRENCY = 8  # transactions in flight at once
+
 
 @dataclass
 class ATTCKTechnique:
@@ -20,76 +26,169 @@ class ADObject:
     properties: Dict
 
 
+async def _aiter(items: Items) -> AsyncIterator[Any]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def _batches(items: Items, key: Callable[[Any], str], row: Callable[[Any], Dict[str, Any]],
+                   batch_size: int) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+    """(key, rows) batches of at most batch_size rows, one buffer per key (e.g. per label)."""
+    buffers: Dict[str, List[Dict[str, Any]]] = {}
+    async for item in _aiter(items):
+        buffer = buffers.setdefault(key(item), [])
+        buffer.append(row(item))
+        if len(buffer) >= batch_size:
+            yield key(item), buffer
+            buffers[key(item)] = []
+    for name, buffer in buffers.items():
+        if buffer:
+            yield name, buffer
+
+
 class ATTCKBloodhound:
-    def __init__(self, neo4j_uri: str, neo4j_user: str, neo4j_password: str):
-        self.driver = GraphDatabase.driver(
+    """
+    ATT&CK techniques and AD objects in Neo4j over the async driver. Every call borrows a session from the
+    driver's connection pool, and at most `concurrency` transactions are in flight at once. The
+    create_*/link_* bulk methods read (async) iterables in batches and keep that many UNWIND
+    transactions running concurrently.
+    """
+
+    def __init__(self, neo4j_uri: str, neo4j_user: str, neo4j_password: str, database: str = "neo4j",
+                 concurrency: int = DEFAULT_CONCURRENCY, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.driver = AsyncGraphDatabase.driver(
             neo4j_uri,
-            auth=(neo4j_user, neo4j_password)
+            auth=(neo4j_user, neo4j_password),
+            max_connection_pool_size=max(concurrency, 1) * 2
         )
-        self.session = None
+        self.database = database
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self._slots = asyncio.Semaphore(concurrency)
 
     async def __aenter__(self):
-        self.session = self.driver.session(database="neo4j")
+        await self.driver.verify_connectivity()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
-        self.driver.close()
+        await self.driver.close()
 
-    async def create_technique(self, technique: ATTCKTechnique):
-        query = """
-            MERGE (t:Technique {
-                TID: $tid,
-                name: $name,
-                tactic: $tactic,
-                description: $description,
-                lastUpdated: $timestamp
-            })
-            RETURN t
+    # --- Statement execution ---
+
+    async def _execute(self, query: str, params: Dict[str, Any], write: bool = True) -> List[Any]:
+        async def work(tx):
+            result = await tx.run(query, params)
+            return [record async for record in result]
+
+        async with self._slots:
+            async with self.driver.session(database=self.database) as session:
+                if write:
+                    return await session.execute_write(work)
+                return await session.execute_read(work)
+
+    async def _write_batches(self, batches: AsyncIterator[Tuple[str, List[Dict[str, Any]]]]) -> int:
+        """Runs (query, rows) batches with up to `concurrency` in flight; returns the rows written."""
+        pending: set = set()
+        written = 0
+        try:
+            async for query, rows in batches:
+                if len(pending) >= self.concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    written += sum(task.result() for task in done)
+                pending.add(asyncio.ensure_future(self._write_rows(query, rows)))
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                written += sum(task.result() for task in done)
+        finally:
+            for task in pending:
+                task.cancel()
+        return written
+
+    async def _write_rows(self, query: str, rows: List[Dict[str, Any]]) -> int:
+        await self._execute(query, {"rows": rows})
+        return len(rows)
+
+    # --- Single objects ---
+    # The UNWIND templates return nothing, so bulk batches don't ship their nodes back; the single-object
+    # methods append the RETURN clause for the node(s) they hand to the caller.
+
+    TECHNIQUE_QUERY = """
+        UNWIND $rows AS row
+        MERGE (t:Technique {TID: row.tid})
+        SET t.name = row.name, t.tactic = row.tactic, t.description = row.description,
+            t.lastUpdated = row.timestamp
+    """
+
+    @staticmethod
+    def ad_object_query(object_type: str) -> str:
+        return f"""
+            UNWIND $rows AS row
+            MERGE (o:{object_type} {{name: row.name}})
+            SET o += row.properties
+        """
+
+    @staticmethod
+    def link_query(object_type: str) -> str:
+        return f"""
+            UNWIND $rows AS row
+            MATCH (t:Technique {{TID: row.technique_tid}})
+            MATCH (o:{object_type} {{name: row.object_name}})
+            MERGE (o)-[:USES_TECHNIQUE]->(t)
         """
-        params = {
+
+    @staticmethod
+    def _technique_row(technique: ATTCKTechnique) -> Dict[str, Any]:
+        return {
             "tid": technique.tid,
             "name": technique.name,
             "tactic": technique.tactic,
             "description": technique.description,
             "timestamp": datetime.now().isoformat()
         }
-        result = await self.session.execute_write(
-            lambda tx: tx.run(query, params)
-        )
-        return result.single()
+
+    @staticmethod
+    def _ad_object_row(obj: ADObject) -> Dict[str, Any]:
+        return {"name": obj.name, "properties": obj.properties}
+
+    async def create_technique(self, technique: ATTCKTechnique):
+        records = await self._execute(self.TECHNIQUE_QUERY + "RETURN t", {"rows": [self._technique_row(technique)]})
+        return records[0] if records else None
 
     async def create_ad_object(self, obj: ADObject):
-        query = """
-            MERGE (o:{type} {
-                name: $name,
-                properties: $properties
-            })
-            RETURN o
-        """.format(type=obj.type)
-        result = await self.session.execute_write(
-            lambda tx: tx.run(query, {
-                "name": obj.name,
-                "properties": obj.properties
-            })
-        )
-        return result.single()
+        records = await self._execute(self.ad_object_query(obj.type) + "RETURN o", {"rows": [self._ad_object_row(obj)]})
+        return records[0] if records else None
 
     async def link_technique_to_object(self, technique_tid: str, object_name: str, object_type: str):
-        query = """
-            MATCH (t:Technique{TID: $technique_tid})
-            MATCH (o:{type}{name: $object_name})
-            MERGE (o)-[:USES_TECHNIQUE]->(t)
-            RETURN t, o
-        """.format(type=object_type)
-        result = await self.session.execute_write(
-            lambda tx: tx.run(query, {
-                "technique_tid": technique_tid,
-                "object_name": object_name
-            })
-        )
-        return result.single()
+        records = await self._execute(self.link_query(object_type) + "RETURN t, o", {
+            "rows": [{"technique_tid": technique_tid, "object_name": object_name}]
+        })
+        return records[0] if records else None
+
+    # --- Bulk, from (async) iterables ---
+
+    async def create_techniques(self, techniques: Items, batch_size: Optional[int] = None) -> int:
+        batches = _batches(techniques, lambda _: self.TECHNIQUE_QUERY, self._technique_row,
+                           batch_size or self.batch_size)
+        return await self._write_batches(batches)
+
+    async def create_ad_objects(self, objects: Items, batch_size: Optional[int] = None) -> int:
+        """ADObjects of any mix of types; batched per type, as the type is the node label."""
+        batches = _batches(objects, lambda obj: self.ad_object_query(obj.type), self._ad_object_row,
+                           batch_size or self.batch_size)
+        return await self._write_batches(batches)
+
+    async def link_techniques_to_objects(self, links: Items, batch_size: Optional[int] = None) -> int:
+        """(technique_tid, object_name, object_type) tuples; run after the techniques and objects exist."""
+        batches = _batches(links, lambda link: self.link_query(link[2]),
+                           lambda link: {"technique_tid": link[0], "object_name": link[1]},
+                           batch_size or self.batch_size)
+        return await self._write_batches(batches)
+
+    # --- Queries ---
 
     async def find_techniques_by_tactic(self, tactic: str):
         query = """
@@ -97,20 +196,14 @@ class ATTCKBloodhound:
             RETURN t.TID as tid, t.name as name
             ORDER BY t.name
         """
-        result = await self.session.execute_read(
-            lambda tx: tx.run(query, {"tactic": tactic})
-        )
-        return [record for record in result]
+        return await self._execute(query, {"tactic": tactic}, write=False)
 
     async def find_objects_using_technique(self, technique_tid: str):
         query = """
             MATCH (o)-[:USES_TECHNIQUE]->(t:Technique{TID: $technique_tid})
-            RETURN DISTINCT o.name as name, TYPE(o) as type
+            RETURN DISTINCT o.name as name, head(labels(o)) as type
         """
-        result = await self.session.execute_read(
-            lambda tx: tx.run(query, {"technique_tid": technique_tid})
-        )
-        return [record for record in result]
+        return await self._execute(query, {"technique_tid": technique_tid}, write=False)
 
 
 # Example usage
@@ -141,8 +234,17 @@ async def main():
         )
         await attck.create_ad_object(computer)
 
+        # Create a burst of AD objects: batched per type, several transactions in flight
+        async def workstations():
+            for i in range(1, 1001):
+                yield ADObject(name=f"WS{i:04d}", type="Computer", properties={"operatingSystem": "Windows 11"})
+
+        created = await attck.create_ad_objects(workstations())
+        print(f"Created {created} workstations")
+
         # Link technique to object
         await attck.link_technique_to_object("T1087", "DC01", "Computer")
+        await attck.link_techniques_to_objects(("T1087", f"WS{i:04d}", "Computer") for i in range(1, 1001))
 
         # Query techniques by tactic
         discovery_techniques = await attck.find_techniques_by_tactic("Discovery")
@@ -158,4 +260,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -4,8 +4,21 @@ Python 3.11 script to exhaustively map BloodHound AD nodes to MITRE ATT&CK nodes
 Creates relationships between BloodHound and MITRE nodes based on analysis of AD data and MITRE ATT&CK tactics/techniques.
 """
 
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
 from neo4j import GraphDatabase
 
+from mapping_rules import DEFAULT_RULES_PATH, compile_rules, load_rules
+from name_matcher import DEFAULT_THRESHOLD, NameMatcher
+from neo4j_bulk import DEFAULT_BATCH_SIZE, DEFAULT_TX_SIZE, BulkWriter, batched, db_hits, ensure_schema, session_runner
+from rule_scheduler import ANY, DEFAULT_WORKERS, Task, run_tasks
+
 # Neo4j connection settings (update as needed)
 uri = "bolt://localhost:7687"
 user = "neo4j"
@@ -17,315 +30,284 @@ USES_TECHNIQUE = "USES_TECHNIQUE"
 USES_TACTIC = "USES_TACTIC"
 ASSOCIATED_WITH = "ASSOCIATED_WITH"
 
+# (label, property) keys the mapping queries look MITRE nodes up by
+MITRE_KEYS = [("Technique", "id"), ("Tactic", "id")]
+
+# Materialized reachability, see materialize_reachability(); removed again by clear_reachability():
+# node property -> (WHERE predicate on the target t, relationship types followed or None for any)
+REACHABILITY = {
+    "hvgroup_hops": ("t:Group AND t.highvalue = true", None),
+    "hvgroup_memberof_hops": ("t:Group AND t.highvalue = true", "MemberOf"),
+    "highvalue_session_hops": ("t.highvalue = true", "MemberOf|HasSession"),
+}
+MAX_HOPS = 10
+
+# The final RETURN clause of a rule; summary mode replaces it with a row count
+_RETURN_CLAUSE = re.compile(r"\bRETURN\b(?![\s\S]*\bRETURN\b)[\s\S]*$", re.IGNORECASE)
+
+def summary_query(query):
+    """The rule with its final RETURN (if any) replaced by a row count, so no rows are streamed back."""
+    if _RETURN_CLAUSE.search(query):
+        return _RETURN_CLAUSE.sub("RETURN count(*) AS rows", query)
+    return query.rstrip() + "\nRETURN count(*) AS rows"
+
+def _run_rule(tx, query, params):
+    result = tx.run(query, params)
+    records = list(result)
+    return records, result.consume()
+
 class BloodhoundToMitreMapper:
-    def __init__(self, uri, user, password):
+    def __init__(self, uri, user, password, debug=False):
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        # Per thread, so scheduled rules (see run_all_mappings()) each get their own writer
+        self._local = threading.local()
+        # debug: mapping rules return their RETURN rows instead of only a count (see run_rule())
+        self.debug = debug
+        # profile: statements run under PROFILE and rule results include db_hits (see run_all_mappings())
+        self.profile = False
+        # rules, rows, relationships_created, db_hits and elapsed seconds summed over every run_rule()
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def writer(self):
+        """Set while inside bulk(): this thread's queries then share its session and transactions."""
+        return getattr(self._local, "writer", None)
+
+    @writer.setter
+    def writer(self, writer):
+        self._local.writer = writer
 
     def close(self):
         self.driver.close()
 
+    def ensure_schema(self):
+        """Index the MITRE lookup keys (idempotent) and wait until the indexes are online."""
+        return ensure_schema(session_runner(self.driver), indexed=MITRE_KEYS)
+
+    @contextmanager
+    def bulk(self, tx_size=DEFAULT_TX_SIZE):
+        """Run every execute_cypher() inside the block over one session, tx_size statements per transaction."""
+        if self.writer is not None:
+            # Already inside bulk(): join the caller's writer
+            yield self.writer
+            return
+        with BulkWriter(self.driver, tx_size=tx_size) as writer:
+            self.writer = writer
+            try:
+                yield writer
+            finally:
+                self.writer = None
+
+    def _record(self, **result):
+        """Add a statement's counts to the scheduled task running on this thread, if any (see _task())."""
+        task_results = getattr(self._local, "results", None)
+        if task_results is not None:
+            task_results.append(result)
+
     def execute_cypher(self, query, **kwargs):
         """Helper to run a Cypher query and return results."""
-        with self.driver.session() as session:
-            return session.run(query, **kwargs)
-
-    def map_groups_to_mitre_groups(self):
+        statement = "PROFILE " + query if self.profile else query
+        if self.writer is not None:
+            records = self.writer.run(statement, **kwargs)
+            summary = self.writer.last_summary
+        else:
+            with self.driver.session() as session:
+                # Read the records before the session closes
+                result = session.run(statement, **kwargs)
+                records = list(result)
+                summary = result.consume()
+        self._record(relationships_created=summary.counters.relationships_created,
+                     db_hits=db_hits(summary.profile) if self.profile else 0)
+        return records
+
+    def run_rule(self, query, **params):
+        """
+        Run one mapping rule as a write and return {"rows", "relationships_created", "db_hits", "elapsed"}.
+        By default the rule's RETURN clause is replaced by count(*), so only the row count comes back
+        over Bolt. In debug mode the rule runs unchanged and its rows are also returned under "records".
+        """
+        started = time.perf_counter()
+        statement = query if self.debug else summary_query(query)
+        if self.profile:
+            statement = "PROFILE " + statement
+        if self.writer is not None:
+            records = self.writer.run(statement, params)
+            summary = self.writer.last_summary
+        else:
+            with self.driver.session() as session:
+                records, summary = session.execute_write(_run_rule, statement, params)
+        rows = len(records) if self.debug else (records[0]["rows"] if records else 0)
+        result = {"rows": rows, "relationships_created": summary.counters.relationships_created,
+                  "db_hits": db_hits(summary.profile) if self.profile else 0,
+                  "elapsed": time.perf_counter() - started}
+        with self._stats_lock:
+            self.stats.update(rules=1, **result)
+        self._record(**result)
+        if self.debug:
+            result["records"] = records
+        return result
+
+    def map_groups_to_mitre_groups(self, threshold=DEFAULT_THRESHOLD, limit=1, batch_size=DEFAULT_BATCH_SIZE):
         """
         Map BloodHound groups to MITRE groups by name similarity.
-        """
-        query = """
-        MATCH (bh:Group), (mitre:Group)
-        WHERE toLower(bh.name) CONTAINS toLower(mitre.name) OR toLower(mitre.name) CONTAINS toLower(bh.name)
-        MERGE (bh)-[:MAPS_TO_MITRE]->(mitre)
-        RETURN bh.name AS bloodhound_group, mitre.name AS mitre_group
-        """
-        return self.execute_cypher(query)
-
-    def map_privileges_to_mitre_techniques(self):
-        """
-        Map BloodHound privileges to MITRE techniques based on real-world mappings.
-        """
-        # GenericAll/Owns: Persistence (T1136), Privilege Escalation (T1068), Account Manipulation (T1098)
-        query = """
-        MATCH (a)-[r:GenericAll|Owns]->(b)
-        MATCH (mitre:Technique)
-        WHERE mitre.id IN ['T1136', 'T1068', 'T1098']
-        MERGE (a)-[:USES_TECHNIQUE]->(mitre)
-        RETURN a.name AS source, b.name AS target, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # WriteDacl: Permission Groups Discovery (T1069), Account Manipulation (T1098)
-        query = """
-        MATCH (a)-[r:WriteDacl]->(b)
-        MATCH (mitre:Technique)
-        WHERE mitre.id IN ['T1069', 'T1098']
-        MERGE (a)-[:USES_TECHNIQUE]->(mitre)
-        RETURN a.name AS source, b.name AS target, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # GenericWrite/WriteOwner: Account Manipulation (T1098)
-        query = """
-        MATCH (a)-[r:GenericWrite|WriteOwner]->(b)
-        MATCH (mitre:Technique {id: 'T1098'})
-        MERGE (a)-[:USES_TECHNIQUE]->(mitre)
-        RETURN a.name AS source, b.name AS target, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-    def map_users_to_mitre_techniques(self):
-        """
-        Map users to MITRE techniques based on privileges, group memberships, and attack paths.
-        """
-        # Users with admin rights: Privilege Escalation (T1068), Credential Access (T1003), Account Manipulation (T1098)
-        query = """
-        MATCH (u:User)-[:MemberOf]->(g:Group {highvalue: true})
-        MATCH (mitre:Technique)
-        WHERE mitre.id IN ['T1068', 'T1003', 'T1098']
-        MERGE (u)-[:USES_TECHNIQUE]->(mitre)
-        RETURN u.name AS user, g.name AS group, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # Users with DCSync rights: Credential Access (T1003), Account Manipulation (T1098)
-        query = """
-        MATCH (u:User)-[:GenericAll|Owns]->(d:Domain)
-        MATCH (mitre:Technique)
-        WHERE mitre.id IN ['T1003', 'T1098']
-        MERGE (u)-[:USES_TECHNIQUE]->(mitre)
-        RETURN u.name AS user, d.name AS domain, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # Users with admin sessions: Lateral Movement (T1021)
-        query = """
-        MATCH (u:User)-[:HasSession]->(c:Computer)
-        WHERE u.admincount = true OR c.highvalue = true
-        MATCH (mitre:Technique {id: 'T1021'})
-        MERGE (u)-[:USES_TECHNIQUE]->(mitre)
-        RETURN u.name AS user, c.name AS computer, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-    def map_computers_to_mitre_techniques(self):
-        """
-        Map computers to MITRE techniques based on roles, sessions, and attack paths.
-        """
-        # Domain controllers: Discovery (T1018), Execution (T1059), Credential Access (T1003)
-        query = """
-        MATCH (c:Computer)
-        WHERE c.name CONTAINS 'DC'
-        MATCH (mitre:Technique)
-        WHERE mitre.id IN ['T1018', 'T1059', 'T1003']
-        MERGE (c)-[:USES_TECHNIQUE]->(mitre)
-        RETURN c.name AS computer, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # Computers with admin sessions: Lateral Movement (T1021)
-        query = """
-        MATCH (u:User)-[:HasSession]->(c:Computer)
-        WHERE u.admincount = true OR c.highvalue = true
-        MATCH (mitre:Technique {id: 'T1021'})
-        MERGE (c)-[:USES_TECHNIQUE]->(mitre)
-        RETURN c.name AS computer, u.name AS user, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-    def map_software_to_mitre_techniques(self):
-        """
-        Map software to MITRE techniques.
-        """
-        # BloodHound: Discovery (T1018)
-        query = """
-        MATCH (s:Software)
-        WHERE toLower(s.name) CONTAINS 'bloodhound'
-        MATCH (mitre:Technique {id: 'T1018'})
-        MERGE (s)-[:USES_TECHNIQUE]->(mitre)
-        RETURN s.name AS software, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # Mimikatz: Credential Access (T1003)
-        query = """
-        MATCH (s:Software)
-        WHERE toLower(s.name) CONTAINS 'mimikatz'
-        MATCH (mitre:Technique {id: 'T1003'})
-        MERGE (s)-[:USES_TECHNIQUE]->(mitre)
-        RETURN s.name AS software, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # Process Injection (T1055), Command and Scripting Interpreter (T1059), Credentials from Password Stores (T1555)
+        Both name sets are read once and matched client side (name_matcher.py: n-gram blocking, rapidfuzz
+        scores), MITRE aliases included. The best `limit` matches scoring at least `threshold` become
+        MAPS_TO_MITRE edges carrying the score, written in batches. Returns the matches, best first.
+        """
+        # MITRE groups carry their ATT&CK id (G0007); every other Group node came from BloodHound
+        mitre_groups = self.execute_cypher("""
+        MATCH (mitre:Group) WHERE mitre.id =~ 'G[0-9]{4}'
+        RETURN elementId(mitre) AS key, mitre.name AS name, coalesce(mitre.alias, []) AS aliases
+        """)
+        bh_groups = self.execute_cypher("""
+        MATCH (bh:Group) WHERE NOT coalesce(bh.id, '') =~ 'G[0-9]{4}'
+        RETURN elementId(bh) AS key, bh.name AS name
+        """)
+        matcher = NameMatcher(((record["key"], name) for record in mitre_groups
+                               for name in [record["name"], *record["aliases"]]), threshold=threshold)
+        rows = [{"src": record["key"], "tgt": match.key, "score": match.score,
+                 "bloodhound_group": record["name"], "mitre_group": match.name}
+                for record in bh_groups for match in matcher.match(record["name"], limit=limit)]
         query = """
-        MATCH (s:Software)
-        WHERE toLower(s.name) CONTAINS 'powershell' OR toLower(s.name) CONTAINS 'cmd' OR toLower(s.name) CONTAINS 'psexec'
-        MATCH (mitre:Technique)
-        WHERE mitre.id IN ['T1055', 'T1059', 'T1555']
-        MERGE (s)-[:USES_TECHNIQUE]->(mitre)
-        RETURN s.name AS software, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-    def map_attack_paths_to_mitre_tactics(self):
-        """
-        Map attack paths to MITRE tactics.
-        """
-        # Paths to high-value groups: Privilege Escalation (TA0004), Lateral Movement (TA0008)
-        query = """
-        MATCH path=(u:User)-[*1..10]->(g:Group {highvalue: true})
-        MATCH (mitre:Tactic)
-        WHERE mitre.id IN ['TA0004', 'TA0008']
-        MERGE (u)-[:USES_TACTIC]->(mitre)
-        RETURN u.name AS user, g.name AS group, mitre.name AS tactic
-        """
-        self.execute_cypher(query)
-
-        # Paths involving DCSync: Credential Access (TA0006)
-        query = """
-        MATCH (u:User)-[:GenericAll|Owns]->(d:Domain)
-        MATCH (mitre:Tactic {id: 'TA0006'})
-        MERGE (u)-[:USES_TACTIC]->(mitre)
-        RETURN u.name AS user, d.name AS domain, mitre.name AS tactic
-        """
-        self.execute_cypher(query)
-
-    def map_attack_paths_to_mitre_techniques(self):
-        """
-        Map attack paths to MITRE techniques based on path properties.
-        """
-        # Paths involving admin sessions: Lateral Movement (T1021)
-        query = """
-        MATCH path=(u:User)-[:MemberOf|HasSession*1..10]->(c:Computer)
-        WHERE any(x IN nodes(path) WHERE x.highvalue = true)
-        MATCH (mitre:Technique {id: 'T1021'})
-        MERGE (u)-[:USES_TECHNIQUE]->(mitre)
-        RETURN u.name AS user, c.name AS computer, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # Paths involving sensitive group membership: Privilege Escalation (T1068)
-        query = """
-        MATCH path=(u:User)-[:MemberOf*1..10]->(g:Group {highvalue: true})
-        MATCH (mitre:Technique {id: 'T1068'})
-        MERGE (u)-[:USES_TECHNIQUE]->(mitre)
-        RETURN u.name AS user, g.name AS group, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-    def map_objects_to_mitre_tactics(self):
-        """
-        Map objects (users, groups, computers) to MITRE tactics based on context.
-        """
-        # Users with admin rights: Privilege Escalation (TA0004)
-        query = """
-        MATCH (u:User)-[:MemberOf]->(g:Group {highvalue: true})
-        MATCH (mitre:Tactic {id: 'TA0004'})
-        MERGE (u)-[:USES_TACTIC]->(mitre)
-        RETURN u.name AS user, g.name AS group, mitre.name AS tactic
-        """
-        self.execute_cypher(query)
-
-        # Computers with admin sessions: Lateral Movement (TA0008)
-        query = """
-        MATCH (u:User)-[:HasSession]->(c:Computer)
-        WHERE u.admincount = true OR c.highvalue = true
-        MATCH (mitre:Tactic {id: 'TA0008'})
-        MERGE (c)-[:USES_TACTIC]->(mitre)
-        RETURN c.name AS computer, u.name AS user, mitre.name AS tactic
-        """
-        self.execute_cypher(query)
-
-        # Computers as domain controllers: Discovery (TA0007), Execution (TA0002)
-        query = """
-        MATCH (c:Computer)
-        WHERE c.name CONTAINS 'DC'
-        MATCH (mitre:Tactic)
-        WHERE mitre.id IN ['TA0007', 'TA0002']
-        MERGE (c)-[:USES_TACTIC]->(mitre)
-        RETURN c.name AS computer, mitre.name AS tactic
-        """
-        self.execute_cypher(query)
-
-    def map_top_mitre_techniques(self):
-        """
-        Map the top MITRE ATT&CK techniques based on real-world prevalence.
-        Includes: Process Injection (T1055), Command and Scripting Interpreter (T1059),
-        Credentials from Password Stores (T1555), Application Layer Protocol (T1071),
-        Impair Defenses (T1562), Data Encrypted for Impact (T1486),
-        System Information Discovery (T1082), Input Capture (T1056),
-        Boot or Logon Autostart Execution (T1547), Data from Local System (T1005)[1][6].
-        """
-        # Map all computers to System Information Discovery (T1082) as an example
-        query = """
-        MATCH (c:Computer)
-        MATCH (mitre:Technique {id: 'T1082'})
-        MERGE (c)-[:USES_TECHNIQUE]->(mitre)
-        RETURN c.name AS computer, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # Map all users with admin sessions to Command and Scripting Interpreter (T1059)
-        query = """
-        MATCH (u:User)-[:HasSession]->(c:Computer)
-        WHERE u.admincount = true OR c.highvalue = true
-        MATCH (mitre:Technique {id: 'T1059'})
-        MERGE (u)-[:USES_TECHNIQUE]->(mitre)
-        RETURN u.name AS user, c.name AS computer, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # Map software (e.g., PowerShell, cmd, psexec) to Command and Scripting Interpreter (T1059)
-        query = """
-        MATCH (s:Software)
-        WHERE toLower(s.name) CONTAINS 'powershell' OR toLower(s.name) CONTAINS 'cmd' OR toLower(s.name) CONTAINS 'psexec'
-        MATCH (mitre:Technique {id: 'T1059'})
-        MERGE (s)-[:USES_TECHNIQUE]->(mitre)
-        RETURN s.name AS software, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-        # Map software (e.g., Mimikatz) to Credentials from Password Stores (T1555)
-        query = """
-        MATCH (s:Software)
-        WHERE toLower(s.name) CONTAINS 'mimikatz'
-        MATCH (mitre:Technique {id: 'T1555'})
-        MERGE (s)-[:USES_TECHNIQUE]->(mitre)
-        RETURN s.name AS software, mitre.name AS technique
-        """
-        self.execute_cypher(query)
-
-    def run_all_mappings(self):
-        """Run all mapping methods."""
-        print("Mapping BloodHound groups to MITRE groups...")
-        self.map_groups_to_mitre_groups()
-
-        print("\nMapping privileges to MITRE techniques...")
-        self.map_privileges_to_mitre_techniques()
-
-        print("\nMapping users to MITRE techniques...")
-        self.map_users_to_mitre_techniques()
-
-        print("\nMapping computers to MITRE techniques...")
-        self.map_computers_to_mitre_techniques()
-
-        print("\nMapping software to MITRE techniques...")
-        self.map_software_to_mitre_techniques()
-
-        print("\nMapping attack paths to MITRE tactics...")
-        self.map_attack_paths_to_mitre_tactics()
-
-        print("\nMapping attack paths to MITRE techniques...")
-        self.map_attack_paths_to_mitre_techniques()
-
-        print("\nMapping objects to MITRE tactics...")
-        self.map_objects_to_mitre_tactics()
-
-        print("\nMapping top MITRE techniques based on real-world prevalence...")
-        self.map_top_mitre_techniques()
+        UNWIND $rows AS row
+        MATCH (bh) WHERE elementId(bh) = row.src
+        MATCH (mitre) WHERE elementId(mitre) = row.tgt
+        MERGE (bh)-[r:MAPS_TO_MITRE]->(mitre)
+        SET r.score = row.score
+        """
+        for batch in batched(rows, batch_size):
+            self.run_rule(query, rows=batch)
+        rows.sort(key=lambda row: row["score"], reverse=True)
+        return rows
+
+    def materialize_reachability(self, max_hops=MAX_HOPS):
+        """
+        Stamp every node that can reach a high-value target within max_hops with its minimum hop count
+        (1 or more, as for a *1..max_hops path), one property per REACHABILITY entry. This is a reverse
+        breadth-first search from the targets, one level per statement. Only the current frontier is
+        expanded, tracked with a temporary label, so each node is stamped once. Targets start out
+        unstamped: one gets a count only if it reaches another target. The attack path rules then read
+        these properties instead of enumerating paths, whose number grows exponentially with length.
+        The properties are working state on the BloodHound nodes; clear_reachability() removes them.
+        Returns {property: nodes reached}.
+        """
+        reached = {}
+        with self.bulk():
+            for prop, (target, rel_types) in REACHABILITY.items():
+                rel = f"[:{rel_types}]" if rel_types else "[]"
+                self.execute_cypher(f"MATCH (n) WHERE n.{prop} IS NOT NULL REMOVE n.{prop}")
+                self.execute_cypher(f"MATCH (t) WHERE {target} SET t:ReachFrontier")
+                total = 0
+                for level in range(1, max_hops + 1):
+                    records = self.execute_cypher(f"""
+                    MATCH (m:ReachFrontier)<-{rel}-(n)
+                    WHERE n.{prop} IS NULL
+                    SET n.{prop} = $level, n:ReachNext
+                    RETURN count(DISTINCT n) AS reached
+                    """, level=level)
+                    self.execute_cypher("MATCH (m:ReachFrontier) REMOVE m:ReachFrontier")
+                    self.execute_cypher("MATCH (n:ReachNext) REMOVE n:ReachNext SET n:ReachFrontier")
+                    count = records[0]["reached"] if records else 0
+                    self._record(rows=count)
+                    total += count
+                    if not count:
+                        break
+                self.execute_cypher("MATCH (m:ReachFrontier) REMOVE m:ReachFrontier")
+                reached[prop] = total
+        return reached
+
+    def clear_reachability(self):
+        """Remove the materialize_reachability() properties from the BloodHound nodes."""
+        with self.bulk():
+            for prop in REACHABILITY:
+                self.execute_cypher(f"MATCH (n) WHERE n.{prop} IS NOT NULL REMOVE n.{prop}")
+
+    def map_rule_table(self, path=DEFAULT_RULES_PATH):
+        """
+        Map AD objects to MITRE techniques and tactics with the rules in the rule table
+        (data/csvs/mitre_mapping_rules.csv, see mapping_rules.py). Rules sharing a graph pattern are
+        compiled into one pass, so each pattern is scanned once. Returns {pass name: run_rule() result}.
+        """
+        results = {}
+        for rule_pass in compile_rules(load_rules(path)):
+            query, params = rule_pass.query()
+            results[rule_pass.name] = self.run_rule(query, **params)
+        return results
+
+    def _task(self, method, *args, **kwargs):
+        """Run method(*args, **kwargs) and total the statements it ran, for run_tasks()."""
+        def run():
+            self._local.results = []
+            try:
+                method(*args, **kwargs)
+                results = self._local.results
+            finally:
+                self._local.results = None
+            totals = {name: sum(result.get(name, 0) for result in results)
+                      for name in ("rows", "relationships_created", "db_hits")}
+            return {**totals, "statements": len(results)}
+        return run
+
+    def mapping_tasks(self, path=DEFAULT_RULES_PATH):
+        """
+        The mapping stages as schedulable tasks: group matching, reachability and one task per rule table
+        pass. A task declares the (relationship type, source label) pairs it writes. Reachability sets
+        properties on nodes of any label, so it runs on its own, before the rules that read them.
+        Passes outside bulk() each run as one managed write transaction (see run_rule()), which the
+        driver retries on transient errors. Concurrent passes still MERGE onto the same Technique and
+        Tactic nodes, and a lock conflict there only repeats the pass that hit it.
+        """
+        tasks = [
+            Task("materialize_reachability", self._task(self.materialize_reachability),
+                 writes=frozenset({(ANY, None)})),
+            Task("map_groups_to_mitre_groups", self._task(self.map_groups_to_mitre_groups),
+                 writes=frozenset({(MAPS_TO_MITRE, "Group")})),
+        ]
+        for rule_pass in compile_rules(load_rules(path)):
+            query, params = rule_pass.query()
+            tasks.append(Task(rule_pass.name, self._task(self.run_rule, query, **params),
+                              writes=frozenset(rule_pass.edge_sources()), requires=frozenset(rule_pass.requires)))
+        return tasks
+
+    def run_all_mappings(self, workers=DEFAULT_WORKERS, report_path=None, profile=False):
+        """
+        Run all mappings, rules writing disjoint relationship types or source labels concurrently on up
+        to `workers` sessions (see rule_scheduler.py). Each rule is timed. With `profile`, every statement
+        runs under PROFILE to count its database hits, at the cost of profiling every operator, so leave
+        it off outside tuning runs. Prints the per-rule report, slowest first, and writes it as JSON to
+        `report_path` if given. Returns the report.
+        """
+        self.ensure_schema()
+        self.profile = profile
+        started = time.perf_counter()
+        try:
+            report = run_tasks(self.mapping_tasks(), workers=workers)
+        finally:
+            self.profile = False
+            # The path rules have read the hop counts; don't leave them on the customer's nodes
+            self.clear_reachability()
+        elapsed = time.perf_counter() - started
+
+        print(f"{'rule':<60} {'status':<8} {'seconds':>8} {'rows':>9} {'created':>9} {'db hits':>11}")
+        for entry in sorted(report, key=lambda entry: entry["elapsed"], reverse=True):
+            print(f"{entry['rule'][:60]:<60} {entry['status']:<8} {entry['elapsed']:>8.2f} {entry.get('rows', 0):>9} "
+                  f"{entry.get('relationships_created', 0):>9} {entry.get('db_hits', 0):>11}")
+            if entry["error"]:
+                print(f"  {entry['error']}")
+        serial = sum(entry["elapsed"] for entry in report)
+        print(f"\nMapping complete in {elapsed:.2f}s ({serial:.2f}s of rule time on {workers} workers)")
+        if report_path:
+            with open(report_path, "w") as fh:
+                json.dump({"workers": workers, "elapsed": elapsed, "rules": report}, fh, indent=2)
+        return report
 
 if __name__ == "__main__":
-    mapper = BloodhoundToMitreMapper(uri, user, password)
-    mapper.run_all_mappings()
+    # MAPPER_DEBUG=1 streams back every rule's rows (see run_rule())
+    mapper = BloodhoundToMitreMapper(uri, user, password, debug=os.environ.get("MAPPER_DEBUG") == "1")
+    # MAPPER_WORKERS concurrent rule sessions; MAPPER_REPORT=path writes the per-rule run report as JSON;
+    # MAPPER_PROFILE=1 adds each rule's database hits to it (see run_all_mappings())
+    mapper.run_all_mappings(workers=int(os.environ.get("MAPPER_WORKERS", DEFAULT_WORKERS)),
+                            report_path=os.environ.get("MAPPER_REPORT"),
+                            profile=os.environ.get("MAPPER_PROFILE") == "1")
     mapper.close()
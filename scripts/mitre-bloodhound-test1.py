@@ -4,9 +4,23 @@
 # The PowerShell ATTCKnowledge script defines classes for MITRE ATT&CK objects (Tactic, Technique, Group, Software)
 # and a function (Invoke-ATTCKnowledge) to fetch and format the ATT&CK data. We replicate those classes and functionality below.
 
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from attck_bundle import (CHUNK_SIZE, dispatch_objects, is_mitre_reference, iter_response_objects,
+                          iter_stream_objects, split_external_references)
+from attck_cache import BundleCache, open_bundle
+from attck_checkpoint import Checkpoint, content_hash
+from attck_delta import PushState, delete_statements, is_retired, model_versions
+from attck_index import ATTCKIndex, EndpointResolver
+from attck_snapshot import Snapshot, snapshot_is_current, write_snapshot
+from neo4j_bulk import DEFAULT_BATCH_SIZE, batched, edge_batches, ensure_schema
+
 class ATTCKTactic:
     """Represents a MITRE ATT&CK Tactic."""
-    def __init__(self, name, description, type_list, ID, wiki, reference, created, modified):
+    def __init__(self, name, description, type_list, ID, wiki, reference, created, modified, stix=None, retired=False,
+                 shortname=None):
         # In PowerShell, this corresponds to class ATTCKTactic with properties Name, Description, Type, ID, Wiki, Reference, Created, Modified.
         self.Name = name
         self.Description = description
@@ -16,10 +30,13 @@ class ATTCKTactic:
         self.Reference = reference      # Reference object (e.g., external reference info from MITRE data).
         self.Created = created          # Timestamp of creation (from MITRE data).
         self.Modified = modified        # Timestamp of last modification.
+        self.STIX = stix                # STIX id of the source object (used by delta pushes).
+        self.Retired = retired          # True if the object is revoked or deprecated in the bundle.
+        self.ShortName = shortname      # x_mitre_shortname, the kill chain phase_name techniques refer to.
 
 class ATTCKTechnique:
     """Represents a MITRE ATT&CK Technique."""
-    def __init__(self, name, description, tactics, platforms, ID, wiki, reference, created, modified):
+    def __init__(self, name, description, tactics, platforms, ID, wiki, reference, created, modified, stix=None, retired=False):
         # PowerShell class ATTCKTechnique properties mapped accordingly.
         self.Name = name
         self.Description = description
@@ -30,10 +47,12 @@ class ATTCKTechnique:
         self.Reference = reference      # MITRE external reference object containing ID/URL.
         self.Created = created
         self.Modified = modified
+        self.STIX = stix                # STIX id of the source object (used by delta pushes).
+        self.Retired = retired          # True if the object is revoked or deprecated in the bundle.
 
 class ATTCKGroup:
     """Represents a MITRE ATT&CK Threat Actor Group (Intrusion Set)."""
-    def __init__(self, name, description, aliases, ID, wiki, reference, created, modified):
+    def __init__(self, name, description, aliases, ID, wiki, reference, created, modified, stix=None, retired=False):
         # PowerShell class ATTCKGroup properties.
         self.Name = name
         self.Description = description
@@ -43,10 +62,12 @@ class ATTCKGroup:
         self.Reference = reference      # External reference object for the group (contains ID/URL).
         self.Created = created
         self.Modified = modified
+        self.STIX = stix                # STIX id of the source object (used by delta pushes).
+        self.Retired = retired          # True if the object is revoked or deprecated in the bundle.
 
 class ATTCKSoftware:
     """Represents a MITRE ATT&CK Software (Tool or Malware)."""
-    def __init__(self, name, description, aliases, software_type, ID, wiki, reference, created, modified):
+    def __init__(self, name, description, aliases, software_type, ID, wiki, reference, created, modified, stix=None, retired=False):
         # PowerShell class ATTCKSoftware properties.
         self.Name = name
         self.Description = description
@@ -57,28 +78,45 @@ class ATTCKSoftware:
         self.Reference = reference      # External reference object.
         self.Created = created
         self.Modified = modified
+        self.STIX = stix                # STIX id of the source object (used by delta pushes).
+        self.Retired = retired          # True if the object is revoked or deprecated in the bundle.
 
 class ATTCKRelationship:
     """Represents a relationship between ATT&CK objects (e.g., Group uses Technique)."""
-    def __init__(self, sourceID, targetID, relationship_type):
+    def __init__(self, sourceID, targetID, relationship_type, stix=None, modified=None, retired=False):
         # This class is not explicitly defined in PowerShell but we create it to handle relationships similarly.
         self.SourceID = sourceID        # STIX ID of source object (could be a group, software, etc.).
         self.TargetID = targetID        # STIX ID of target object (e.g., technique or software).
         self.Type = relationship_type   # Relationship type (e.g., "uses").
+        self.STIX = stix                # STIX id of the relationship object itself.
+        self.Modified = modified
+        self.Retired = retired
+
+# MITRE provides the ATT&CK content in JSON (STIX) format on GitHub (similar to how the PS script fetched data from GitHub).
+# URLs for the ATT&CK STIX JSON files:
+enterprise_url = "https://raw.githubusercontent.com/mitre/cti/master/enterprise-attack/enterprise-attack.json"
+preattack_url = "https://raw.githubusercontent.com/mitre/cti/master/pre-attack/pre-attack.json"
+mobile_url   = "https://raw.githubusercontent.com/mitre/cti/master/mobile-attack/mobile-attack.json"
+ATTCK_DATA_SOURCES = [("Enterprise", enterprise_url), ("PRE-ATT&CK", preattack_url), ("Mobile", mobile_url)]
 
-def fetch_attck_data(verbose=False):
+def fetch_attck_data(verbose=False, stream=False, cache=None, bundle_paths=None, parallel=False, max_workers=None):
     """
     Equivalent to Invoke-ATTCKnowledge -Sync.
     Fetches MITRE ATT&CK datasets (Enterprise, PRE-ATT&CK, Mobile) from MITRE's public GitHub repository,
     then formats the data into ATTCKTactic, ATTCKTechnique, ATTCKGroup, ATTCKSoftware objects.
-    Returns a dictionary containing lists of all objects and relationships.
+    With stream=True each bundle's objects are parsed as the body downloads instead of via response.json(),
+    so peak memory stays at roughly one STIX object rather than the whole bundle.
+    With a BundleCache (attck_cache.py) bundles are served from disk after an ETag/Last-Modified
+    revalidation; bundle_paths maps a domain name to a pinned local .json/.zst bundle for offline runs.
+    With parallel=True the domain downloads overlap on a thread pool and each domain is parsed in its own
+    process (max_workers caps the process pool); results are merged in the fixed domain order.
+    Returns a dictionary containing lists of all objects and relationships, and under "Index" an
+    ATTCKIndex for O(1) lookups by STIX id, external ID or tactic shortname across all domains.
     """
-    # MITRE provides the ATT&CK content in JSON (STIX) format on GitHub (similar to how the PS script fetched data from GitHub).
-    # URLs for the ATT&CK STIX JSON files:
-    enterprise_url = "https://raw.githubusercontent.com/mitre/cti/master/enterprise-attack/enterprise-attack.json"
-    preattack_url = "https://raw.githubusercontent.com/mitre/cti/master/pre-attack/pre-attack.json"
-    mobile_url   = "https://raw.githubusercontent.com/mitre/cti/master/mobile-attack/mobile-attack.json"
-    data_sources = [("Enterprise", enterprise_url), ("PRE-ATT&CK", preattack_url), ("Mobile", mobile_url)]
+    data_sources = ATTCK_DATA_SOURCES
+
+    if parallel:
+        return _fetch_attck_data_parallel(data_sources, verbose, cache, bundle_paths, max_workers)
 
     # Containers for parsed objects:
     tactics_list = []
@@ -88,177 +126,248 @@ def fetch_attck_data(verbose=False):
     relationships_list = []
 
     for domain_name, url in data_sources:
+        local_fp = None
         try:
-            # Use requests to fetch the JSON data (similar to Invoke-RestMethod in PowerShell).
-            response = requests.get(url)
-            response.raise_for_status()
+            if bundle_paths and domain_name in bundle_paths:
+                # Pinned local bundle (air-gapped / CI runs).
+                local_fp = open_bundle(bundle_paths[domain_name])
+            elif cache is not None:
+                # Cached bundle; only hits the network for a conditional revalidation.
+                local_fp = cache.open(url)
+            else:
+                # Use requests to fetch the JSON data (similar to Invoke-RestMethod in PowerShell).
+                response = requests.get(url, stream=stream)
+                response.raise_for_status()
         except Exception as e:
             if verbose:
                 print(f"[!] Error fetching {domain_name} ATT&CK data: {e}")
             continue
+        if local_fp is not None:
+            # Local bundles are always parsed incrementally straight from disk.
+            stix_objects = iter_stream_objects(local_fp)
+        elif stream:
+            # Objects are decoded lazily inside parse_domain(); malformed JSON surfaces there (caught below).
+            stix_objects = iter_response_objects(response)
+        else:
+            try:
+                attack_data = response.json()
+            except Exception as e:
+                if verbose:
+                    print(f"[!] Error parsing JSON for {domain_name}: {e}")
+                continue
+            stix_objects = attack_data.get("objects", [])
+
+        if verbose:
+            print(f"[+] Importing {domain_name} ATT&CK data...")
+
+        # Single pass over the domain's objects, dispatched on STIX type. When streaming, decode errors and
+        # network errors mid-download are raised from in here; skip the domain as for a failed response.json().
         try:
-            attack_data = response.json()
+            parsed = parse_domain(domain_name, stix_objects)
         except Exception as e:
             if verbose:
                 print(f"[!] Error parsing JSON for {domain_name}: {e}")
             continue
-
-        if verbose:
-            print(f"[+] Importing {domain_name} ATT&CK data...")
-
-        # Build index to map STIX object IDs to our objects (for relationships linking)
-        stix_object_index = {}
-
-        # Iterate through all objects in the STIX JSON:
-        for obj in attack_data.get("objects", []):
-            obj_type = obj.get("type")
-            # Handle Tactic objects (type: x-mitre-tactic)
-            if obj_type == "x-mitre-tactic":
-                name = obj.get("name", "")
-                description = obj.get("description", "")
-                # Each tactic belongs to a particular ATT&CK matrix domain.
-                type_list = [domain_name]  # e.g. "Enterprise", "PRE-ATT&CK", or "Mobile"
-                # Find external reference for MITRE ATT&CK that provides the tactic ID and wiki URL.
-                ext_refs = obj.get("external_references", [])
-                mitre_id = None
-                mitre_url = None
-                reference_obj = None
-                for ref in ext_refs:
-                    # source_name might be "mitre-attack", "mitre-pre-attack", or "mitre-mobile-attack"
-                    if ref.get("source_name", "").startswith("mitre"):
-                        mitre_id = ref.get("external_id")
-                        mitre_url = ref.get("url")
-                        reference_obj = ref
-                        break
-                # If not found, fall back to the first reference if available.
-                if reference_obj is None and ext_refs:
-                    reference_obj = ext_refs[0]
-                    mitre_id = mitre_id or reference_obj.get("external_id")
-                    mitre_url = mitre_url or reference_obj.get("url")
-                # Use external_id as tactic ID (e.g., TA0001) or fallback to STIX id.
-                tactic_id = mitre_id if mitre_id else obj.get("id")
-                created = obj.get("created")
-                modified = obj.get("modified")
-                # Instantiate ATTCKTactic object
-                tactic_obj = ATTCKTactic(name, description, type_list, tactic_id, mitre_url, reference_obj, created, modified)
-                tactics_list.append(tactic_obj)
-                stix_object_index[obj["id"]] = tactic_obj
-
-            # Handle Technique objects (type: attack-pattern)
-            elif obj_type == "attack-pattern":
-                name = obj.get("name", "")
-                description = obj.get("description", "")
-                # kill_chain_phases contains tactic info (phase_name is the tactical category)
-                tactic_phases = []
-                for phase in obj.get("kill_chain_phases", []):
-                    # Include phases from the relevant kill_chain (mitre attack or mobile or pre-attack)
-                    if phase.get("kill_chain_name", "").startswith("mitre"):
-                        tactic_phases.append(phase.get("phase_name"))
-                # Platforms on which this technique is applicable
-                platforms = obj.get("x_mitre_platforms", []) or []
-                # External reference for technique ID and URL (source_name "mitre-attack" etc.)
-                ext_refs = obj.get("external_references", [])
-                mitre_id = None
-                mitre_url = None
-                reference_obj = None
-                for ref in ext_refs:
-                    if ref.get("source_name", "").startswith("mitre"):
-                        mitre_id = ref.get("external_id")
-                        mitre_url = ref.get("url")
-                        reference_obj = ref
-                        break
-                if reference_obj is None and ext_refs:
-                    reference_obj = ext_refs[0]
-                    mitre_id = mitre_id or reference_obj.get("external_id")
-                    mitre_url = mitre_url or reference_obj.get("url")
-                technique_id = mitre_id if mitre_id else obj.get("id")
-                created = obj.get("created")
-                modified = obj.get("modified")
-                # Instantiate ATTCKTechnique
-                technique_obj = ATTCKTechnique(name, description, tactic_phases, platforms, technique_id, mitre_url, reference_obj, created, modified)
-                techniques_list.append(technique_obj)
-                stix_object_index[obj["id"]] = technique_obj
-
-            # Handle Group objects (type: intrusion-set, representing threat actor groups)
-            elif obj_type == "intrusion-set":
-                name = obj.get("name", "")
-                description = obj.get("description", "")
-                aliases = obj.get("aliases", []) or []  # list of group aliases
-                ext_refs = obj.get("external_references", [])
-                mitre_id = None
-                mitre_url = None
-                reference_obj = None
-                for ref in ext_refs:
-                    if ref.get("source_name", "").startswith("mitre"):
-                        mitre_id = ref.get("external_id")
-                        mitre_url = ref.get("url")
-                        reference_obj = ref
-                        break
-                if reference_obj is None and ext_refs:
-                    reference_obj = ext_refs[0]
-                    mitre_id = mitre_id or reference_obj.get("external_id")
-                    mitre_url = mitre_url or reference_obj.get("url")
-                group_id = mitre_id if mitre_id else obj.get("id")
-                created = obj.get("created")
-                modified = obj.get("modified")
-                # Instantiate ATTCKGroup
-                group_obj = ATTCKGroup(name, description, aliases, group_id, mitre_url, reference_obj, created, modified)
-                groups_list.append(group_obj)
-                stix_object_index[obj["id"]] = group_obj
-
-            # Handle Software objects (types: tool, malware)
-            elif obj_type in ("tool", "malware"):
-                name = obj.get("name", "")
-                description = obj.get("description", "")
-                # Tools and malware might have an "x_mitre_aliases" field or "aliases"
-                aliases = obj.get("x_mitre_aliases", []) or obj.get("aliases", []) or []
-                software_type = "Tool" if obj_type == "tool" else "Malware"
-                ext_refs = obj.get("external_references", [])
-                mitre_id = None
-                mitre_url = None
-                reference_obj = None
-                for ref in ext_refs:
-                    if ref.get("source_name", "").startswith("mitre"):
-                        mitre_id = ref.get("external_id")
-                        mitre_url = ref.get("url")
-                        reference_obj = ref
-                        break
-                if reference_obj is None and ext_refs:
-                    reference_obj = ext_refs[0]
-                    mitre_id = mitre_id or reference_obj.get("external_id")
-                    mitre_url = mitre_url or reference_obj.get("url")
-                software_id = mitre_id if mitre_id else obj.get("id")
-                created = obj.get("created")
-                modified = obj.get("modified")
-                # Instantiate ATTCKSoftware
-                software_obj = ATTCKSoftware(name, description, aliases, software_type, software_id, mitre_url, reference_obj, created, modified)
-                software_list.append(software_obj)
-                stix_object_index[obj["id"]] = software_obj
-
-            # Handle Relationship objects (type: relationship, e.g., usage relationships between objects)
-            elif obj_type == "relationship":
-                rel_type = obj.get("relationship_type")
-                source_ref = obj.get("source_ref")   # STIX ID of source object
-                target_ref = obj.get("target_ref")   # STIX ID of target object
-                # We're interested in "uses" relationships (Group uses Software or Technique, Software uses Technique, etc.)
-                if rel_type == "uses":
-                    relationship_obj = ATTCKRelationship(source_ref, target_ref, rel_type)
-                    relationships_list.append(relationship_obj)
-                    # (We will resolve these to actual nodes when pushing to Neo4j)
+        finally:
+            (local_fp or response).close()
+        tactics_list.extend(parsed["Tactics"])
+        techniques_list.extend(parsed["Techniques"])
+        groups_list.extend(parsed["Groups"])
+        software_list.extend(parsed["Software"])
+        relationships_list.extend(parsed["Relationships"])
 
         if verbose:
             print(f"[+] Processed {domain_name} ATT&CK objects.")
 
     if verbose:
         print("[+] ATT&CK data import and formatting complete.")
-    # Return a dictionary of all collected objects.
-    return {
+    # Return a dictionary of all collected objects, plus the cross-domain lookup index.
+    return index_attck_data({
         "Tactics": tactics_list,
         "Techniques": techniques_list,
         "Groups": groups_list,
         "Software": software_list,
         "Relationships": relationships_list
-    }
+    })
+
+# Model classes for each key of the fetch_attck_data() dictionary, used to rebuild it from a snapshot.
+ATTCK_DATA_CLASSES = {
+    "Tactics": ATTCKTactic,
+    "Techniques": ATTCKTechnique,
+    "Groups": ATTCKGroup,
+    "Software": ATTCKSoftware,
+    "Relationships": ATTCKRelationship,
+}
+
+def index_attck_data(attck_data):
+    """
+    Adds attck_data["Index"]: an ATTCKIndex (attck_index.py) resolving STIX ids, external IDs and
+    tactic shortnames (optionally per domain) to objects across every domain, in O(1).
+    """
+    attck_data["Index"] = ATTCKIndex.build(
+        attck_data["Tactics"],
+        [obj for key in ("Techniques", "Groups", "Software", "Relationships") for obj in attck_data[key]],
+        stix="STIX", external_id="ID", shortname="ShortName", domain="Type")
+    return attck_data
+
+# Recorded in snapshots written by save_attck_data(); the other scripts store different tables
+SNAPSHOT_KIND = "mitre-bloodhound-test1"
+
+def save_attck_data(attck_data, path, meta=None):
+    """Writes the dictionary returned by fetch_attck_data() to a binary snapshot (see attck_snapshot.py)."""
+    write_snapshot(path, {key: attck_data[key] for key in ATTCK_DATA_CLASSES}, {**(meta or {}), "kind": SNAPSHOT_KIND})
+
+def load_attck_data(path):
+    """
+    Rebuilds the fetch_attck_data() dictionary from a snapshot. Identity fields are memory-mapped;
+    Description and Reference are only decoded when first accessed.
+    """
+    snapshot = Snapshot(path, kind=SNAPSHOT_KIND)
+    return index_attck_data({key: snapshot.load_objects(key, cls) for key, cls in ATTCK_DATA_CLASSES.items()})
+
+def _download_domain(domain_name, url, cache, bundle_paths, tmp_dir):
+    """Thread-pool worker: make one domain's bundle available as a local file and return its path."""
+    if bundle_paths and domain_name in bundle_paths:
+        return bundle_paths[domain_name]
+    if cache is not None:
+        return cache.path(url)
+    path = os.path.join(tmp_dir, os.path.basename(url))
+    with requests.get(url, stream=True) as response:
+        response.raise_for_status()
+        with open(path, "wb") as fh:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                fh.write(chunk)
+    return path
+
+def _parse_domain_file(domain_name, path):
+    """Process-pool worker: parse one domain's bundle from disk."""
+    with open_bundle(path) as fp:
+        return parse_domain(domain_name, iter_stream_objects(fp))
+
+def _fetch_attck_data_parallel(data_sources, verbose, cache, bundle_paths, max_workers):
+    """Parallel body of fetch_attck_data(parallel=True); returns the same dictionary."""
+    merged = {"Tactics": [], "Techniques": [], "Groups": [], "Software": [], "Relationships": []}
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            ThreadPoolExecutor(max_workers=len(data_sources)) as downloads, \
+            ProcessPoolExecutor(max_workers=max_workers) as parsers:
+        # Start every download at once; each domain goes to the parser pool as soon as its file is on disk.
+        pending = {downloads.submit(_download_domain, domain_name, url, cache, bundle_paths, tmp_dir): domain_name
+                   for domain_name, url in data_sources}
+        parses = {}
+        for future in as_completed(pending):
+            domain_name = pending[future]
+            try:
+                path = future.result()
+            except Exception as e:
+                if verbose:
+                    print(f"[!] Error fetching {domain_name} ATT&CK data: {e}")
+                continue
+            if verbose:
+                print(f"[+] Importing {domain_name} ATT&CK data...")
+            parses[domain_name] = parsers.submit(_parse_domain_file, domain_name, path)
+
+        # Merge in data_sources order so the result does not depend on which domain finished first.
+        for domain_name, _ in data_sources:
+            if domain_name not in parses:
+                continue
+            try:
+                parsed = parses[domain_name].result()
+            except Exception as e:
+                if verbose:
+                    print(f"[!] Error parsing JSON for {domain_name}: {e}")
+                continue
+            for key, objects in parsed.items():
+                merged[key].extend(objects)
+            if verbose:
+                print(f"[+] Processed {domain_name} ATT&CK objects.")
+
+    if verbose:
+        print("[+] ATT&CK data import and formatting complete.")
+    return index_attck_data(merged)
+
+def mitre_reference(obj):
+    """
+    Resolve the MITRE external reference of a STIX object in one scan of external_references.
+    source_name might be "mitre-attack", "mitre-pre-attack", or "mitre-mobile-attack"; if none is
+    present we fall back to the first reference. Returns (external_id, url, reference_obj).
+    """
+    refs = split_external_references(obj, match=is_mitre_reference)
+    reference_obj = refs.primary
+    if reference_obj is None and refs.others:
+        reference_obj = refs.others[0]
+    if reference_obj is None:
+        return None, None, None
+    return reference_obj.get("external_id"), reference_obj.get("url"), reference_obj
+
+def parse_domain(domain_name, stix_objects):
+    """
+    Formats one ATT&CK domain's STIX objects into ATTCK* objects in a single pass,
+    using a type -> handler dispatch table. Returns lists keyed like fetch_attck_data().
+    """
+    parsed = {"Tactics": [], "Techniques": [], "Groups": [], "Software": [], "Relationships": []}
+
+    # Handle Tactic objects (type: x-mitre-tactic)
+    def add_tactic(obj):
+        # Each tactic belongs to a particular ATT&CK matrix domain, e.g. "Enterprise", "PRE-ATT&CK", or "Mobile".
+        mitre_id, mitre_url, reference_obj = mitre_reference(obj)
+        # Use external_id as tactic ID (e.g., TA0001) or fallback to STIX id.
+        tactic_obj = ATTCKTactic(obj.get("name", ""), obj.get("description", ""), [domain_name],
+                                 mitre_id if mitre_id else obj.get("id"), mitre_url, reference_obj,
+                                 obj.get("created"), obj.get("modified"), obj["id"], is_retired(obj),
+                                 obj.get("x_mitre_shortname"))
+        parsed["Tactics"].append(tactic_obj)
+
+    # Handle Technique objects (type: attack-pattern)
+    def add_technique(obj):
+        # kill_chain_phases contains tactic info (phase_name is the tactical category); include phases
+        # from the relevant kill_chain (mitre attack or mobile or pre-attack).
+        tactic_phases = [phase.get("phase_name") for phase in obj.get("kill_chain_phases", [])
+                         if phase.get("kill_chain_name", "").startswith("mitre")]
+        # Platforms on which this technique is applicable
+        platforms = obj.get("x_mitre_platforms", []) or []
+        mitre_id, mitre_url, reference_obj = mitre_reference(obj)
+        technique_obj = ATTCKTechnique(obj.get("name", ""), obj.get("description", ""), tactic_phases, platforms,
+                                       mitre_id if mitre_id else obj.get("id"), mitre_url, reference_obj,
+                                       obj.get("created"), obj.get("modified"), obj["id"], is_retired(obj))
+        parsed["Techniques"].append(technique_obj)
+
+    # Handle Group objects (type: intrusion-set, representing threat actor groups)
+    def add_group(obj):
+        aliases = obj.get("aliases", []) or []  # list of group aliases
+        mitre_id, mitre_url, reference_obj = mitre_reference(obj)
+        group_obj = ATTCKGroup(obj.get("name", ""), obj.get("description", ""), aliases,
+                               mitre_id if mitre_id else obj.get("id"), mitre_url, reference_obj,
+                               obj.get("created"), obj.get("modified"), obj["id"], is_retired(obj))
+        parsed["Groups"].append(group_obj)
+
+    # Handle Software objects (types: tool, malware)
+    def add_software(obj):
+        # Tools and malware might have an "x_mitre_aliases" field or "aliases"
+        aliases = obj.get("x_mitre_aliases", []) or obj.get("aliases", []) or []
+        software_type = "Tool" if obj.get("type") == "tool" else "Malware"
+        mitre_id, mitre_url, reference_obj = mitre_reference(obj)
+        software_obj = ATTCKSoftware(obj.get("name", ""), obj.get("description", ""), aliases, software_type,
+                                     mitre_id if mitre_id else obj.get("id"), mitre_url, reference_obj,
+                                     obj.get("created"), obj.get("modified"), obj["id"], is_retired(obj))
+        parsed["Software"].append(software_obj)
+
+    # Handle Relationship objects (type: relationship, e.g., usage relationships between objects)
+    def add_relationship(obj):
+        # We're interested in "uses" relationships (Group uses Software or Technique, Software uses Technique, etc.)
+        # (We will resolve these to actual nodes when pushing to Neo4j)
+        if obj.get("relationship_type") == "uses":
+            parsed["Relationships"].append(ATTCKRelationship(obj.get("source_ref"), obj.get("target_ref"), "uses",
+                                                                 obj.get("id"), obj.get("modified"), is_retired(obj)))
+
+    dispatch_objects(stix_objects, {
+        "x-mitre-tactic": add_tactic,
+        "attack-pattern": add_technique,
+        "intrusion-set": add_group,
+        "tool": add_software,
+        "malware": add_software,
+        "relationship": add_relationship,
+    })
+    return parsed
 
 # ===== CypherDog15_Alpha3.ps1 Conversion =====
 # The CypherDog script provides functionality to interact with the Neo4j (BloodHound) database via its REST API.
@@ -269,26 +378,38 @@ import json
 # Connection configuration (Neo4j server running BloodHound DB).
 Server = "localhost"
 Port = "7474"
-# Build the REST API endpoint URL for Cypher queries (Neo4j 3.x uses /db/data/cypher for queries).
-Neo4j_Cypher_URL = f"http://{Server}:{Port}/db/neo4j/tx/commit"
+# Transactional HTTP API endpoints (Neo4j 4+): POST to /tx opens a transaction, /tx/commit runs and commits in one go.
+Neo4j_Tx_URL = f"http://{Server}:{Port}/db/neo4j/tx"
+Neo4j_Cypher_URL = f"{Neo4j_Tx_URL}/commit"
 # HTTP headers for JSON format
 Headers = {
     'Accept': 'application/json; charset=UTF-8',
     'Content-Type': 'application/json'
 }
+# Statements packed into the "statements" array of one HTTP request.
+STATEMENTS_PER_REQUEST = 100
 
-def send_cypher_query(query, params=None):
+# One pooled session for every request, so the connection to Neo4j is kept alive between statements.
+http_session = requests.Session()
+http_session.headers.update(Headers)
+
+def post_statements(url, statements):
     """
-    Sends a Cypher query to the Neo4j REST API and returns the JSON result.
-    Equivalent to using Invoke-RestMethod in PowerShell with the constructed body.
+    POSTs (query, params) pairs as the "statements" array of one request to a transactional endpoint.
+    Returns the response; raises requests.RequestException on HTTP errors.
+    """
+    body = {"statements": [{"statement": query, "parameters": params or {}} for query, params in statements]}
+    response = http_session.post(url, data=json.dumps(body))
+    response.raise_for_status()  # Raise exception for HTTP errors (e.g., if Neo4j is not reachable)
+    return response
+
+def send_cypher_statements(statements):
+    """
+    Sends several (query, params) pairs in a single auto-commit request (one round trip, one transaction)
+    and returns the JSON result: one entry in "results" per statement, failures in "errors".
     """
-    body = {
-        "query": query,
-        "params": params or {}
-    }
     try:
-        response = requests.post(Neo4j_Cypher_URL, headers=Headers, data=json.dumps(body))
-        response.raise_for_status()  # Raise exception for HTTP errors (e.g., if Neo4j is not reachable)
+        response = post_statements(Neo4j_Cypher_URL, statements)
     except requests.RequestException as e:
         # If there's an error, we print it (similar to PowerShell script which showed errors but continued).
         print(f"[!] Error executing Cypher query: {e}")
@@ -298,33 +419,138 @@ def send_cypher_query(query, params=None):
     except ValueError:
         return None
 
-def add_node(label, properties):
+def send_cypher_query(query, params=None):
     """
-    Create or merge a node with the given label and properties in the Neo4j database.
-    This function constructs a Cypher MERGE query.
+    Sends a Cypher query to the Neo4j REST API and returns the JSON result.
+    Equivalent to using Invoke-RestMethod in PowerShell with the constructed body.
     """
-    # Construct MERGE query with parameterized properties.
-    # We use ID as the unique property for merging (ensuring no duplicates for the same object).
-    prop_assignments = ", ".join([f"n.{key} = {{P_{key}}}" for key in properties.keys()])
-    query = f"MERGE (n:{label} {{ID: {{P_ID}}}}) SET {prop_assignments}"
+    return send_cypher_statements([(query, params)])
+
+class CypherError(Exception):
+    """A statement sent through the REST API failed (HTTP error or Cypher errors in the response)."""
+
+class HTTPTransaction:
+    """
+    An explicit transaction on the HTTP API that spans several requests. Statements passed to run() are
+    buffered and sent per_request at a time; the first request opens the transaction (POST /tx) and
+    commit() sends whatever is left to its commit URL. A transaction that never filled a request is sent
+    as a single auto-commit request instead. Errors raise CypherError; Neo4j rolls the transaction back.
+    Used as a context manager it commits on success and rolls back on an exception.
+    """
+    def __init__(self, per_request=STATEMENTS_PER_REQUEST):
+        self.per_request = per_request
+        self.pending = []
+        self.url = None         # the open transaction, from the Location header
+        self.commit_url = None
+        self.requests = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def run(self, query, params=None):
+        self.pending.append((query, params))
+        if len(self.pending) >= self.per_request:
+            self._post(self.url or Neo4j_Tx_URL)
+
+    def commit(self):
+        self._post(self.commit_url or Neo4j_Cypher_URL)
+        self.url = self.commit_url = None
+
+    def rollback(self):
+        self.pending = []
+        if self.url is not None:
+            try:
+                http_session.delete(self.url)
+            except requests.RequestException:
+                pass  # the server expires abandoned transactions anyway
+        self.url = self.commit_url = None
+
+    def _post(self, url):
+        statements, self.pending = self.pending, []
+        try:
+            response = post_statements(url, statements)
+            result = response.json()
+        except (requests.RequestException, ValueError) as e:
+            self.rollback()
+            raise CypherError(f"HTTP transaction request failed: {e}") from e
+        self.requests += 1
+        if result.get("errors"):
+            self.url = self.commit_url = None  # the server rolled it back
+            raise CypherError("; ".join(error.get("message", "") for error in result["errors"]))
+        if url == Neo4j_Tx_URL:
+            self.url = response.headers.get("Location")
+            self.commit_url = result.get("commit") or f"{self.url}/commit"
+        return result
+
+def node_statement(label, properties):
+    """
+    The (query, params) MERGE for add_node(): merged on ID (ensuring no duplicates for the same object),
+    with every property set from a P_-prefixed parameter.
+    """
+    prop_assignments = ", ".join([f"n.{key} = $P_{key}" for key in properties.keys()])
+    query = f"MERGE (n:{label} {{ID: $P_ID}}) SET {prop_assignments}"
     # Prepare parameters dictionary with prefix P_ for each property
     params = {f"P_{key}": value for key, value in properties.items()}
     # Ensure there's an ID param (if the object uses 'ID' property as unique key).
     params["P_ID"] = properties.get("ID") or properties.get("name") or properties.get("Name")
+    return query, params
+
+def add_node(label, properties):
+    """
+    Create or merge a node with the given label and properties in the Neo4j database.
+    This function constructs a Cypher MERGE query.
+    """
     # Execute the query via REST API
-    return send_cypher_query(query, params)
+    return send_cypher_query(*node_statement(label, properties))
 
 def add_relationship(source_label, source_id, rel_type, target_label, target_id):
     """
     Create a relationship of type rel_type between two nodes identified by their labels and unique IDs.
     This function will MATCH the source and target nodes by ID and MERGE the relationship.
     """
-    query = (f"MATCH (a:{source_label} {{ID: {{P_source}}}}), "
-             f"(b:{target_label} {{ID: {{P_target}}}}) "
+    query = (f"MATCH (a:{source_label} {{ID: $P_source}}), "
+             f"(b:{target_label} {{ID: $P_target}}) "
              f"MERGE (a)-[r:{rel_type}]->(b)")
     params = {"P_source": source_id, "P_target": target_id}
     return send_cypher_query(query, params)
 
+def relationship_statements(edges, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    (query, params) pairs for (source_label, source_id, rel_type, target_label, target_id) rows, grouped by
+    label pair and type into UNWIND ... MERGE statements of batch_size rows each.
+    """
+    return [(query, {"rows": rows}) for query, rows in edge_batches(edges, key="ID", batch_size=batch_size)]
+
+def add_relationships(edges, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Batched add_relationship(): sends the relationship_statements() for edges packed into a single
+    auto-commit request.
+    """
+    statements = relationship_statements(edges, batch_size)
+    return send_cypher_statements(statements) if statements else None
+
+def run_cypher_checked(query, params=None):
+    """send_cypher_query() that raises CypherError instead of printing/returning the failure."""
+    result = send_cypher_query(query, params)
+    if result is None:
+        raise CypherError(f"request failed: {query}")
+    if result.get("errors"):
+        raise CypherError("; ".join(error.get("message", "") for error in result["errors"]))
+    return result
+
+def ensure_bloodhound_schema(labels):
+    """
+    Creates (idempotently) a uniqueness constraint on ID for each node label we MERGE on, falling back
+    to an index where the constraint cannot be created, and waits for the indexes to come online.
+    """
+    return ensure_schema(run_cypher_checked, [(label, "ID") for label in labels], errors=(CypherError,))
+
 # (CypherDog also likely provided various query helper functions for BloodHound data retrieval,
 # but for this conversion task we focus on the insertion functionality as needed by PushToBH.)
 
@@ -333,8 +559,15 @@ def add_relationship(source_label, source_id, rel_type, target_label, target_id)
 # It uses ATTCKnowledge to get the data, then uses CypherDog functions to push nodes and relationships into Neo4j.
 # We combine these steps in the push_to_bloodhound function. We also include any ASCII art or user output from the original scripts.
 
-def push_to_bloodhound():
-    """Main routine to load ATT&CK data and push it into BloodHound's Neo4j database."""
+def push_to_bloodhound(state_path=None, checkpoint_path=None, resume=False):
+    """
+    Main routine to load ATT&CK data and push it into BloodHound's Neo4j database.
+    With state_path (or ATTCK_PUSH_STATE) only the objects created, modified, revoked or deprecated since the
+    push that wrote the state file are sent (see attck_delta.py); the file is rewritten after the push.
+    With checkpoint_path (or ATTCK_PUSH_CHECKPOINT) every committed batch of statements is recorded there, and
+    resume (or ATTCK_PUSH_RESUME=1) skips the batches an interrupted push of the same data already committed
+    (see attck_checkpoint.py).
+    """
     # Print ASCII art banners (from CypherDog and ATTCKnowledge scripts)
     # CypherDog v1.5 Alpha3 ASCII banner (as seen in the PowerShell script output).
     print("--------------------------------------------")
@@ -356,7 +589,17 @@ def push_to_bloodhound():
     print("========================================")
 
     # Invoke the ATTCK data fetch (equivalent to ATTCKnowledge -Sync -Verbose).
-    attck_data = fetch_attck_data(verbose=True)
+    # Set ATTCK_SNAPSHOT to a directory to reuse the parsed data across runs. It is rebuilt when a
+    # cached bundle changes (a new ATT&CK release) or was written by another script.
+    snapshot_path = os.environ.get("ATTCK_SNAPSHOT")
+    cache = BundleCache()
+    bundles = cache.digests(url for _, url in ATTCK_DATA_SOURCES) if snapshot_path else {}
+    if snapshot_is_current(snapshot_path, SNAPSHOT_KIND, bundles):
+        attck_data = load_attck_data(snapshot_path)
+    else:
+        attck_data = fetch_attck_data(verbose=True, cache=cache, parallel=True)
+        if snapshot_path:
+            save_attck_data(attck_data, snapshot_path, meta={"bundles": bundles})
 
     # Define mapping of ATT&CK object types to BloodHound node labels.
     # These mappings were chosen to align with BloodHound's expected node types so that icons display distinctively.
@@ -365,133 +608,138 @@ def push_to_bloodhound():
     SoftwareLabel = "Computer"  # Use "Computer" label for Software (tools/malware) to reuse the computer icon
     TacticLabel = "OU"          # Use "OU" (Organizational Unit) label for Tactics (as a category folder icon)
 
-    # Insert all Technique nodes into Neo4j
-    for tech in attck_data["Techniques"]:
-        node_properties = {
-            "ID": tech.ID,
-            "name": tech.Name,
-            "description": tech.Description
-        }
-        add_node(TechniqueLabel, node_properties)
-
-    # Insert all Group nodes
-    for grp in attck_data["Groups"]:
-        node_properties = {
-            "ID": grp.ID,
-            "name": grp.Name,
-            "description": grp.Description
-        }
-        add_node(GroupLabel, node_properties)
-
-    # Insert all Software nodes (tools and malware)
-    for sw in attck_data["Software"]:
-        node_properties = {
-            "ID": sw.ID,
-            "name": sw.Name,
-            "description": sw.Description
-        }
-        add_node(SoftwareLabel, node_properties)
-
-    # Insert all Tactic nodes
-    for tac in attck_data["Tactics"]:
-        node_properties = {
-            "ID": tac.ID,
-            "name": tac.Name,
-            "description": tac.Description
-        }
-        add_node(TacticLabel, node_properties)
-
-    # Insert all relationships (uses relationships between groups, software, and techniques).
-    for rel in attck_data["Relationships"]:
-        src_id = rel.SourceID   # STIX ID of the source object
-        tgt_id = rel.TargetID   # STIX ID of the target object
-        rel_type = "Uses"       # We'll label all these relationships as "Uses"
-
-        # Determine source and target labels by looking at STIX ID prefixes (intrusion-set--, malware--, tool--, attack-pattern--, x-mitre-tactic--).
-        source_label = None
-        target_label = None
-        if src_id.startswith("intrusion-set--"):
-            source_label = GroupLabel
-        elif src_id.startswith("attack-pattern--"):
-            source_label = TechniqueLabel
-        elif src_id.startswith("malware--") or src_id.startswith("tool--"):
-            source_label = SoftwareLabel
-        elif src_id.startswith("x-mitre-tactic--"):
-            source_label = TacticLabel
-
-        if tgt_id.startswith("intrusion-set--"):
-            target_label = GroupLabel
-        elif tgt_id.startswith("attack-pattern--"):
-            target_label = TechniqueLabel
-        elif tgt_id.startswith("malware--") or tgt_id.startswith("tool--"):
-            target_label = SoftwareLabel
-        elif tgt_id.startswith("x-mitre-tactic--"):
-            target_label = TacticLabel
-
-        if source_label is None or target_label is None:
-            # If we can't determine the type (should not happen for "uses" relationships in ATT&CK data), skip.
-            continue
-
-        # Determine the external IDs we used as node IDs in the database:
-        # The objects in attck_data have external IDs as their .ID attribute (if available).
-        # If an object didn't have an external_id, .ID might be the full STIX ID. We must match those.
-        source_ext_id = None
-        target_ext_id = None
-
-        # Find source external ID by checking the lists of objects
-        if source_label == TechniqueLabel:
-            for tech in attck_data["Techniques"]:
-                # If the STIX IDs match (or the external reference object matches by ID), use the object's ID field.
-                # (tech.ID is already the external technique ID if available, otherwise STIX ID).
-                if src_id == tech.Reference.get("source_id", "") or src_id == tech.Reference.get("source_ref", "") or src_id == tech.ID:
-                    source_ext_id = tech.ID
-                    break
-        elif source_label == GroupLabel:
-            for grp in attck_data["Groups"]:
-                if src_id == grp.Reference.get("source_id", "") or src_id == grp.Reference.get("source_ref", "") or src_id == grp.ID:
-                    source_ext_id = grp.ID
-                    break
-        elif source_label == SoftwareLabel:
-            for sw in attck_data["Software"]:
-                if src_id == sw.Reference.get("source_id", "") or src_id == sw.Reference.get("source_ref", "") or src_id == sw.ID:
-                    source_ext_id = sw.ID
-                    break
-        elif source_label == TacticLabel:
-            for tac in attck_data["Tactics"]:
-                if src_id == tac.Reference.get("source_id", "") or src_id == tac.Reference.get("source_ref", "") or src_id == tac.ID:
-                    source_ext_id = tac.ID
-                    break
-
-        # Find target external ID similarly
-        if target_label == TechniqueLabel:
-            for tech in attck_data["Techniques"]:
-                if tgt_id == tech.Reference.get("source_id", "") or tgt_id == tech.Reference.get("source_ref", "") or tgt_id == tech.ID:
-                    target_ext_id = tech.ID
-                    break
-        elif target_label == GroupLabel:
-            for grp in attck_data["Groups"]:
-                if tgt_id == grp.Reference.get("source_id", "") or tgt_id == grp.Reference.get("source_ref", "") or tgt_id == grp.ID:
-                    target_ext_id = grp.ID
-                    break
-        elif target_label == SoftwareLabel:
-            for sw in attck_data["Software"]:
-                if tgt_id == sw.Reference.get("source_id", "") or tgt_id == sw.Reference.get("source_ref", "") or tgt_id == sw.ID:
-                    target_ext_id = sw.ID
-                    break
-        elif target_label == TacticLabel:
-            for tac in attck_data["Tactics"]:
-                if tgt_id == tac.Reference.get("source_id", "") or tgt_id == tac.Reference.get("source_ref", "") or tgt_id == tac.ID:
-                    target_ext_id = tac.ID
-                    break
-
-        # If not found via references, default to using the STIX IDs directly (which would match if we inserted nodes with STIX IDs in .ID).
-        if source_ext_id is None:
-            source_ext_id = src_id
-        if target_ext_id is None:
-            target_ext_id = tgt_id
-
-        # Add the relationship to the database
-        add_relationship(source_label, source_ext_id, rel_type, target_label, target_ext_id)
+    # Index every ID we MERGE and MATCH on before writing anything.
+    ensure_bloodhound_schema([TechniqueLabel, GroupLabel, SoftwareLabel, TacticLabel])
+
+    # Delta push: diff the parsed objects against the previous push by STIX id and Modified timestamp.
+    state_path = state_path or os.environ.get("ATTCK_PUSH_STATE")
+    state = PushState.load(state_path) if state_path else None
+    versions = model_versions((obj for key in ATTCK_DATA_CLASSES for obj in attck_data[key]),
+                              stix="STIX", modified="Modified", retired="Retired")
+    checkpoint = Checkpoint.open(checkpoint_path or os.environ.get("ATTCK_PUSH_CHECKPOINT"), content_hash(versions),
+                                 resume=resume or os.environ.get("ATTCK_PUSH_RESUME") == "1")
+    if checkpoint.resumed:
+        print(f"[+] Resuming from checkpoint: {checkpoint.stages}")
+    # Endpoints resolve through the hash index built by index_attck_data(): the label from the STIX type
+    # prefix, the ID from the object with that STIX id (objects not found keep the STIX id).
+    resolver = EndpointResolver(attck_data["Index"], {
+        "intrusion-set": GroupLabel,
+        "attack-pattern": TechniqueLabel,
+        "malware": SoftwareLabel,
+        "tool": SoftwareLabel,
+        "x-mitre-tactic": TacticLabel,
+    }, key="ID")
+    # Relationships without a node at both ends (e.g. a campaign's "uses") are never pushed; leave them
+    # out of the delta too, or every run would report them as created.
+    unpushable = {rel.STIX for rel in attck_data["Relationships"]
+                  if resolver.resolve(rel.SourceID) is None or resolver.resolve(rel.TargetID) is None}
+    # Everything below is written in HTTPTransactions of STATEMENTS_PER_REQUEST statements per request.
+    # Without a checkpoint it is one transaction: the graph never holds half a push, and a failure rolls
+    # all of it back. With a checkpoint every batch is committed and recorded as it completes instead.
+    with HTTPTransaction() as tx:
+        upserts = None
+        if state is not None:
+            delta = state.diff({stix: version for stix, version in versions.items() if stix not in unpushable})
+            upserts = delta.upserts
+            print(f"[+] Delta push: {delta.summary()}")
+            # Remove deleted objects and the old edges of updated relationships before upserting. The deletes
+            # are a stage of their own, committed first: a resumed push must not delete again the edges whose
+            # re-creating batches the checkpoint skips.
+            deletes = list(delete_statements(state, state.retractions(delta), key_property="ID"))
+            for index, statements in checkpoint.pending("deletes", [deletes]):
+                for query, params in statements:
+                    tx.run(query, params)
+                if checkpoint.path:
+                    tx.commit()
+                    checkpoint.commit("deletes", index)
+        pushed = PushState()  # What the graph holds after this push, saved for the next delta.
+        node_statements = {label: [] for label in (TechniqueLabel, GroupLabel, SoftwareLabel, TacticLabel)}
+
+        def changed(obj):
+            return upserts is None or getattr(obj, "STIX", None) in upserts
+
+        def record_node(label, obj):
+            if getattr(obj, "STIX", None) and not getattr(obj, "Retired", False):
+                pushed.add_node(obj.STIX, obj.Modified, label, obj.ID)
+
+        # Insert all Technique nodes into Neo4j
+        for tech in attck_data["Techniques"]:
+            node_properties = {
+                "ID": tech.ID,
+                "name": tech.Name,
+                "description": tech.Description
+            }
+            if changed(tech):
+                node_statements[TechniqueLabel].append(node_statement(TechniqueLabel, node_properties))
+            record_node(TechniqueLabel, tech)
+
+        # Insert all Group nodes
+        for grp in attck_data["Groups"]:
+            node_properties = {
+                "ID": grp.ID,
+                "name": grp.Name,
+                "description": grp.Description
+            }
+            if changed(grp):
+                node_statements[GroupLabel].append(node_statement(GroupLabel, node_properties))
+            record_node(GroupLabel, grp)
+
+        # Insert all Software nodes (tools and malware)
+        for sw in attck_data["Software"]:
+            node_properties = {
+                "ID": sw.ID,
+                "name": sw.Name,
+                "description": sw.Description
+            }
+            if changed(sw):
+                node_statements[SoftwareLabel].append(node_statement(SoftwareLabel, node_properties))
+            record_node(SoftwareLabel, sw)
+
+        # Insert all Tactic nodes
+        for tac in attck_data["Tactics"]:
+            node_properties = {
+                "ID": tac.ID,
+                "name": tac.Name,
+                "description": tac.Description
+            }
+            if changed(tac):
+                node_statements[TacticLabel].append(node_statement(TacticLabel, node_properties))
+            record_node(TacticLabel, tac)
+
+        # Insert all relationships (uses relationships between groups, software, and techniques).
+        # They are collected first and then sent in batches, grouped by label pair.
+        edges = []
+        for rel in attck_data["Relationships"]:
+            rel_type = "Uses"       # We'll label all these relationships as "Uses"
+            source = resolver.resolve(rel.SourceID)
+            target = resolver.resolve(rel.TargetID)
+            if source is None or target is None:
+                # If we can't determine the type (should not happen for "uses" relationships in ATT&CK data), skip.
+                continue
+            source_label, source_ext_id = source
+            target_label, target_ext_id = target
+
+            # Add the relationship to the database
+            if changed(rel):
+                edges.append((source_label, source_ext_id, rel_type, target_label, target_ext_id))
+            if getattr(rel, "STIX", None) and not getattr(rel, "Retired", False):
+                pushed.add_edge(rel.STIX, rel.Modified, source_label, source_ext_id, rel_type, target_label, target_ext_id)
+
+        # Send everything in numbered batches per stage, one request's worth each.
+        stages = [(f"nodes:{label}", batched(statements, STATEMENTS_PER_REQUEST))
+                  for label, statements in node_statements.items()]
+        stages.append(("edges", batched(relationship_statements(edges), STATEMENTS_PER_REQUEST)))
+        for stage, batches in stages:
+            for index, batch in checkpoint.pending(stage, batches):
+                for query, params in batch:
+                    tx.run(query, params)
+                if checkpoint.path:
+                    tx.commit()  # durable before it is recorded as committed
+                    checkpoint.commit(stage, index)
+
+    checkpoint.finish()
+    if state_path:
+        pushed.save(state_path)
 
     # if verbose:
         print("[+] Completed pushing ATT&CK data to BloodHound (Neo4j). You can now query it via the BloodHound interface.")
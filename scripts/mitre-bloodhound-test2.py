@@ -10,18 +10,28 @@ Requires:
     neo4j (pip install neo4j)
 """
 
+import os
 import requests
 import json
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from neo4j import GraphDatabase
 
+from attck_bundle import (ENTERPRISE_ATTACK_URL, dispatch_objects, iter_stream_objects, iter_url_objects,
+                          split_external_references)
+from attck_cache import BundleCache, open_bundle
+from attck_export import relationship_type
+from attck_index import ATTCKIndex, EndpointResolver
+from attck_snapshot import Snapshot, snapshot_is_current, write_snapshot
+from neo4j_bulk import DEFAULT_BATCH_SIZE, batched, edge_batches, ensure_schema, session_runner
+
 # =========================
 # === Data Model Classes ==
 # =========================
 
 class ATTCKTactic:
-    def __init__(self, name, description, type_, id_, wiki, reference, created, modified, contributor, stix):
+    def __init__(self, name, description, type_, id_, wiki, reference, created, modified, contributor, stix,
+                 shortname=None):
         self.name = name
         self.description = description
         self.type = type_
@@ -32,6 +42,7 @@ class ATTCKTactic:
         self.modified = modified
         self.contributor = contributor
         self.stix = stix
+        self.shortname = shortname
 
 class ATTCKTechnique:
     def __init__(self, name, tactic, description, platform, permission, bypass, effective_perm,
@@ -97,6 +108,9 @@ class ATTCKRelationship:
 # === Knowledge Fetch & Parsing ==
 # ================================
 
+# Recorded in snapshots written by ATTCKnowledge.save(); the other scripts store different tables
+SNAPSHOT_KIND = 'mitre-bloodhound-test2'
+
 class ATTCKnowledge:
     """
     Main knowledge object, holds all parsed ATT&CK data.
@@ -107,124 +121,179 @@ class ATTCKnowledge:
         self.group = []
         self.software = []
         self.relationship = []
+        self._index = None
+
+    @property
+    def index(self):
+        """
+        ATTCKIndex (attck_index.py) over the parsed objects: O(1) lookups by STIX id,
+        external ID and tactic shortname. Built on first use.
+        """
+        if self._index is None:
+            self._index = ATTCKIndex.build(self.tactic, self.technique + self.group + self.software + self.relationship)
+        return self._index
 
-    def sync(self):
+    def sync(self, stream=False, cache=None, bundle_path=None):
         """
         Fetches and parses ATT&CK Enterprise data from MITRE CTI GitHub.
+        With stream=True the bundle is parsed incrementally as it downloads.
+        With a BundleCache (see attck_cache.py) the bundle is read from disk after
+        an ETag/Last-Modified revalidation; bundle_path pins a local .json/.zst file.
         """
+        if bundle_path or cache is not None:
+            print("[*] Loading ATT&CK Enterprise data from", bundle_path or "cache")
+            with (open_bundle(bundle_path) if bundle_path else cache.open(ENTERPRISE_ATTACK_URL)) as fp:
+                self.parse_objects(iter_stream_objects(fp))
+            return
         print("[*] Fetching ATT&CK Enterprise data...")
-        url = "https://raw.githubusercontent.com/mitre/cti/master/enterprise-attack/enterprise-attack.json"
-        resp = requests.get(url)
+        if stream:
+            self.parse_objects(iter_url_objects(ENTERPRISE_ATTACK_URL))
+            return
+        resp = requests.get(ENTERPRISE_ATTACK_URL)
         resp.raise_for_status()
         data = resp.json()
-        objects = data['objects']
-
-        # Parse Tactics
-        print("[*] Parsing Tactics...")
-        for obj in filter(lambda o: o.get('type') == 'x-mitre-tactic', objects):
-            self.tactic.append(ATTCKTactic(
-                name=obj.get('name'),
-                description=obj.get('description'),
-                type_=obj.get('type'),
-                id_=get_external_id(obj),
-                wiki=get_external_url(obj),
-                reference=get_references(obj),
-                created=obj.get('created'),
-                modified=obj.get('modified'),
-                contributor=obj.get('x_mitre_contributors', []),
-                stix=obj.get('id')
-            ))
-
-        # Parse Techniques
-        print("[*] Parsing Techniques...")
-        taclist = [o for o in objects if o.get('type') == 'course-of-action']
-        for obj in filter(lambda o: o.get('type') == 'attack-pattern', objects):
-            tech_name = obj.get('name')
-            mitigation = next((t.get('description') for t in taclist if t.get('name') == tech_name), None)
-            self.technique.append(ATTCKTechnique(
-                name=tech_name,
-                tactic=[phase.get('phase_name') for phase in obj.get('kill_chain_phases', [])] if obj.get('kill_chain_phases') else [],
-                description=obj.get('description'),
-                platform=obj.get('x_mitre_platforms', []),
-                permission=obj.get('x_mitre_permissions_required', []),
-                bypass=obj.get('x_mitre_defense_bypassed', []),
-                effective_perm=obj.get('x_mitre_effective_permissions', []),
-                network=obj.get('x_mitre_network_requirements'),
-                remote=obj.get('x_mitre_remote_support'),
-                prereq=obj.get('x_mitre_system_requirements'),
-                detection=obj.get('x_mitre_detection'),
-                mitigation=mitigation,
-                data_source=obj.get('x_mitre_data_sources', []),
-                id_=get_external_id(obj),
-                wiki=get_external_url(obj),
-                reference=get_references(obj),
-                created=obj.get('created'),
-                modified=obj.get('modified'),
-                contributor=obj.get('x_mitre_contributors', []),
-                stix=obj.get('id')
-            ))
-
-        # Parse Groups
-        print("[*] Parsing Groups...")
-        for obj in filter(lambda o: o.get('type') == 'intrusion-set', objects):
-            self.group.append(ATTCKGroup(
-                name=obj.get('name'),
-                description=obj.get('description'),
-                alias=obj.get('aliases', []),
-                id_=get_external_id(obj),
-                wiki=get_external_url(obj),
-                reference=get_references(obj),
-                created=obj.get('created'),
-                modified=obj.get('modified'),
-                contributor=obj.get('x_mitre_contributors', []),
-                stix=obj.get('id')
-            ))
-
-        # Parse Software
-        print("[*] Parsing Software...")
-        for obj in filter(lambda o: o.get('type') in ['tool', 'malware'], objects):
-            self.software.append(ATTCKSoftware(
-                name=obj.get('name'),
-                description=obj.get('description'),
-                type_=obj.get('type'),
-                alias=obj.get('x_mitre_aliases', []),
-                id_=get_external_id(obj),
-                wiki=get_external_url(obj),
-                reference=get_references(obj),
-                created=obj.get('created'),
-                modified=obj.get('modified'),
-                contributor=obj.get('x_mitre_contributors', []),
-                stix=obj.get('id')
-            ))
-
-        # Parse Relationships
-        print("[*] Parsing Relationships...")
-        for obj in filter(lambda o: o.get('type') == 'relationship', objects):
-            self.relationship.append(ATTCKRelationship(
-                source=obj.get('source_ref'),
-                edge=obj.get('relationship_type'),
-                target=obj.get('target_ref'),
-                description=obj.get('description'),
-                reference=get_references(obj)
-            ))
+        self.parse_objects(data['objects'])
+
+    def parse_objects(self, objects):
+        """
+        Parses an iterable of STIX objects in a single pass, dispatching each one
+        on its type. Works equally on a loaded list or a stream from attck_bundle.
+        """
+        print("[*] Parsing Tactics, Techniques, Groups, Software and Relationships...")
+        self._index = None
+        # Courses of action may appear after the techniques they share a name with,
+        # so mitigations are attached once the pass is complete (first match by name wins).
+        mitigations = {}
+
+        def add_software(obj):
+            self.software.append(software_from_stix(obj))
+
+        dispatch_objects(objects, {
+            'x-mitre-tactic': lambda obj: self.tactic.append(tactic_from_stix(obj)),
+            'attack-pattern': lambda obj: self.technique.append(technique_from_stix(obj, None)),
+            'course-of-action': lambda obj: mitigations.setdefault(obj.get('name'), obj.get('description')),
+            'intrusion-set': lambda obj: self.group.append(group_from_stix(obj)),
+            'tool': add_software,
+            'malware': add_software,
+            'relationship': lambda obj: self.relationship.append(relationship_from_stix(obj)),
+        })
+        for tech in self.technique:
+            tech.mitigation = mitigations.get(tech.name)
+
+    def save(self, path, meta=None):
+        """Writes the parsed knowledge to a binary snapshot directory (see attck_snapshot.py)."""
+        write_snapshot(path, {
+            'tactic': self.tactic,
+            'technique': self.technique,
+            'group': self.group,
+            'software': self.software,
+            'relationship': self.relationship,
+        }, {**(meta or {}), 'kind': SNAPSHOT_KIND})
+
+    @classmethod
+    def load(cls, path):
+        """Loads a snapshot written by save(); bulky text fields are decoded on first access."""
+        snapshot = Snapshot(path, kind=SNAPSHOT_KIND)
+        knowledge = cls()
+        knowledge.tactic = snapshot.load_objects('tactic', ATTCKTactic)
+        knowledge.technique = snapshot.load_objects('technique', ATTCKTechnique)
+        knowledge.group = snapshot.load_objects('group', ATTCKGroup)
+        knowledge.software = snapshot.load_objects('software', ATTCKSoftware)
+        knowledge.relationship = snapshot.load_objects('relationship', ATTCKRelationship)
+        return knowledge
+
+def tactic_from_stix(obj):
+    refs = split_external_references(obj)
+    return ATTCKTactic(
+        name=obj.get('name'),
+        description=obj.get('description'),
+        type_=obj.get('type'),
+        id_=refs.external_id,
+        wiki=refs.url,
+        reference=refs.others,
+        created=obj.get('created'),
+        modified=obj.get('modified'),
+        contributor=obj.get('x_mitre_contributors', []),
+        stix=obj.get('id'),
+        shortname=obj.get('x_mitre_shortname')
+    )
+
+def technique_from_stix(obj, mitigation):
+    refs = split_external_references(obj)
+    return ATTCKTechnique(
+        name=obj.get('name'),
+        tactic=[phase.get('phase_name') for phase in obj.get('kill_chain_phases', [])] if obj.get('kill_chain_phases') else [],
+        description=obj.get('description'),
+        platform=obj.get('x_mitre_platforms', []),
+        permission=obj.get('x_mitre_permissions_required', []),
+        bypass=obj.get('x_mitre_defense_bypassed', []),
+        effective_perm=obj.get('x_mitre_effective_permissions', []),
+        network=obj.get('x_mitre_network_requirements'),
+        remote=obj.get('x_mitre_remote_support'),
+        prereq=obj.get('x_mitre_system_requirements'),
+        detection=obj.get('x_mitre_detection'),
+        mitigation=mitigation,
+        data_source=obj.get('x_mitre_data_sources', []),
+        id_=refs.external_id,
+        wiki=refs.url,
+        reference=refs.others,
+        created=obj.get('created'),
+        modified=obj.get('modified'),
+        contributor=obj.get('x_mitre_contributors', []),
+        stix=obj.get('id')
+    )
+
+def group_from_stix(obj):
+    refs = split_external_references(obj)
+    return ATTCKGroup(
+        name=obj.get('name'),
+        description=obj.get('description'),
+        alias=obj.get('aliases', []),
+        id_=refs.external_id,
+        wiki=refs.url,
+        reference=refs.others,
+        created=obj.get('created'),
+        modified=obj.get('modified'),
+        contributor=obj.get('x_mitre_contributors', []),
+        stix=obj.get('id')
+    )
+
+def software_from_stix(obj):
+    refs = split_external_references(obj)
+    return ATTCKSoftware(
+        name=obj.get('name'),
+        description=obj.get('description'),
+        type_=obj.get('type'),
+        alias=obj.get('x_mitre_aliases', []),
+        id_=refs.external_id,
+        wiki=refs.url,
+        reference=refs.others,
+        created=obj.get('created'),
+        modified=obj.get('modified'),
+        contributor=obj.get('x_mitre_contributors', []),
+        stix=obj.get('id')
+    )
+
+def relationship_from_stix(obj):
+    return ATTCKRelationship(
+        source=obj.get('source_ref'),
+        edge=obj.get('relationship_type'),
+        target=obj.get('target_ref'),
+        description=obj.get('description'),
+        reference=get_references(obj)
+    )
 
 def get_external_id(obj):
     """Extracts the MITRE ATT&CK external_id from external_references."""
-    for ref in obj.get('external_references', []):
-        if ref.get('source_name') == 'mitre-attack':
-            return ref.get('external_id')
-    return None
+    return split_external_references(obj).external_id
 
 def get_external_url(obj):
     """Extracts the MITRE ATT&CK URL from external_references."""
-    for ref in obj.get('external_references', []):
-        if ref.get('source_name') == 'mitre-attack':
-            return ref.get('url')
-    return None
+    return split_external_references(obj).url
 
 def get_references(obj):
     """Returns all non-mitre-attack external references."""
-    return [ref for ref in obj.get('external_references', []) if ref.get('source_name') != 'mitre-attack']
+    return split_external_references(obj).others
 
 # ==============================
 # === CypherDog (Mapping) ======
@@ -237,57 +306,74 @@ class CypherDog:
     def __init__(self, knowledge: ATTCKnowledge):
         self.knowledge = knowledge
 
-    def generate_neo4j_queries(self):
+    # One node template per label: MERGE on the STIX id (always present and unique), the rest as properties
+    NODE_TEMPLATE = (
+        "UNWIND $rows AS row "
+        "MERGE (n:{label} {{stix: row.stix}}) "
+        "SET n.id = row.id, n.name = row.name, n.description = row.description"
+    )
+
+    def generate_neo4j_queries(self, batch_size=DEFAULT_BATCH_SIZE):
         """
-        Converts ATT&CK knowledge into Cypher queries for Neo4j.
-        Returns a list of Cypher query strings.
+        Converts ATT&CK knowledge into parameterized Cypher for Neo4j.
+        Returns a list of (query, params) pairs: a fixed set of UNWIND templates (one per node
+        label, one per edge label pair and type), each with a batch of rows in params['rows'].
+        Nothing is inlined into the query text, so Neo4j plans each template once, and every
+        node lookup goes through a label and the indexed stix property.
         """
         queries = []
 
-        # Create Tactic nodes
-        for tactic in self.knowledge.tactic:
-            queries.append(
-                f"MERGE (t:Tactic {{id: '{tactic.id}'}}) "
-                f"SET t.name = $name, t.description = $description"
-            )
-
-        # Create Technique nodes and relationships to Tactic
+        # Tactic, Technique, Group and Software nodes
+        for label, objects in (('Tactic', self.knowledge.tactic), ('Technique', self.knowledge.technique),
+                               ('Group', self.knowledge.group), ('Software', self.knowledge.software)):
+            rows = [{'stix': obj.stix, 'id': obj.id, 'name': obj.name, 'description': obj.description}
+                    for obj in objects if obj.stix]
+            query = self.NODE_TEMPLATE.format(label=label)
+            queries.extend((query, {'rows': batch}) for batch in batched(rows, batch_size))
+
+        # Tactic -> Technique links: kill chain phase names are tactic shortnames, resolved via the index
+        resolver = self.resolver()
+        edges = []
         for tech in self.knowledge.technique:
-            queries.append(
-                f"MERGE (tech:Technique {{id: '{tech.id}'}}) "
-                f"SET tech.name = $name, tech.description = $description"
-            )
-            # Link to Tactic
-            for tactic_name in tech.tactic:
-                queries.append(
-                    f"MATCH (t:Tactic), (tech:Technique) "
-                    f"WHERE t.name = $tactic_name AND tech.id = '{tech.id}' "
-                    f"MERGE (t)-[:USES]->(tech)"
-                )
-
-        # Create Group nodes
-        for group in self.knowledge.group:
-            queries.append(
-                f"MERGE (g:Group {{id: '{group.id}'}}) "
-                f"SET g.name = $name, g.description = $description"
-            )
-
-        # Create Software nodes
-        for sw in self.knowledge.software:
-            queries.append(
-                f"MERGE (s:Software {{id: '{sw.id}'}}) "
-                f"SET s.name = $name, s.description = $description"
-            )
-
-        # Create Relationships (Group/Software/Technique)
-        for rel in self.knowledge.relationship:
-            # This is a simplified mapping; in practice, you'd want to resolve source/target types
-            queries.append(
-                f"MATCH (a), (b) WHERE a.stix = '{rel.source}' AND b.stix = '{rel.target}' "
-                f"MERGE (a)-[:{rel.edge.upper()}]->(b)"
-            )
+            for phase_name in tech.tactic:
+                tactic = resolver.tactic(phase_name)
+                if tactic is not None and tech.stix:
+                    edges.append((*tactic, 'USES', 'Technique', tech.stix))
+
+        # Relationships (Group/Software/Technique)
+        edges.extend(self.relationship_rows())
+        queries.extend((query, {'rows': rows}) for query, rows in edge_batches(edges, key='stix', batch_size=batch_size))
         return queries
 
+    def relationship_rows(self):
+        """
+        (source label, source stix, TYPE, target label, target stix) rows for the edge batches of generate_neo4j_queries().
+        Labels come from the STIX id prefix; relationships to object types without nodes are skipped.
+        Types come from attck_export.relationship_type() (subtechnique-of -> SUBTECHNIQUE_OF), as in the other pushers.
+        """
+        resolver = self.resolver()
+        for rel in self.knowledge.relationship:
+            src = resolver.resolve(rel.source)
+            tgt = resolver.resolve(rel.target)
+            if src and tgt:
+                yield (*src, relationship_type(rel.edge), *tgt)
+
+    def resolver(self):
+        """(label, stix) endpoints for STIX ids and kill chain phases, via the knowledge base's index."""
+        return EndpointResolver(self.knowledge.index, STIX_LABELS, key='stix')
+
+# STIX id prefix -> node label used by CypherDog
+STIX_LABELS = {
+    'x-mitre-tactic': 'Tactic',
+    'attack-pattern': 'Technique',
+    'intrusion-set': 'Group',
+    'tool': 'Software',
+    'malware': 'Software',
+}
+
+def stix_label(stix_id):
+    return STIX_LABELS.get((stix_id or '').split('--', 1)[0])
+
 # ===================================
 # === PushToBH (Neo4j Integration) ==
 # ===================================
@@ -299,11 +385,24 @@ class PushToBH:
     def __init__(self, uri, user, password):
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
 
+    def ensure_schema(self, labels=('Tactic', 'Technique', 'Group', 'Software')):
+        """
+        Creates uniqueness constraints on stix (nodes are MERGEd and relationships matched on it)
+        and indexes on id (looked up by the mapper) for each label, then waits for them to come online.
+        """
+        return ensure_schema(session_runner(self.driver),
+                             unique=[(label, 'stix') for label in labels],
+                             indexed=[(label, 'id') for label in labels])
+
     def push_queries(self, queries, params=None):
+        """
+        Runs query strings (with the shared params) or (query, params) pairs as produced by
+        CypherDog.generate_neo4j_queries(), each batch in its own write transaction.
+        """
         with self.driver.session() as session:
             for query in queries:
-                # Use parameters for safety, but for demo, we use string formatting
-                session.run(query, params or {})
+                query, query_params = query if isinstance(query, tuple) else (query, params or {})
+                session.execute_write(lambda tx: tx.run(query, query_params).consume())
 
     def close(self):
         self.driver.close()
@@ -314,8 +413,18 @@ class PushToBH:
 
 def main():
     # 1. Sync ATT&CK Knowledge
-    knowledge = ATTCKnowledge()
-    knowledge.sync()
+    # Set ATTCK_SNAPSHOT to a directory to skip fetching and parsing on later runs. It is rebuilt when
+    # the cached bundle changes (a new ATT&CK release) or was written by another script.
+    snapshot_path = os.environ.get("ATTCK_SNAPSHOT")
+    cache = BundleCache()
+    bundles = cache.digests([ENTERPRISE_ATTACK_URL]) if snapshot_path else {}
+    if snapshot_is_current(snapshot_path, SNAPSHOT_KIND, bundles):
+        knowledge = ATTCKnowledge.load(snapshot_path)
+    else:
+        knowledge = ATTCKnowledge()
+        knowledge.sync(cache=cache)
+        if snapshot_path:
+            knowledge.save(snapshot_path, meta={"source": ENTERPRISE_ATTACK_URL, "bundles": bundles})
 
     # 2. Map to Cypher/BloodHound queries
     cypher_dog = CypherDog(knowledge)
@@ -327,6 +436,7 @@ def main():
     neo4j_user = "neo4j"
     neo4j_pass = "your_password"
     pusher = PushToBH(neo4j_uri, neo4j_user, neo4j_pass)
+    pusher.ensure_schema()
     pusher.push_queries(queries)
     pusher.close()
     print("[*] Done.")
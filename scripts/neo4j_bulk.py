@@ -0,0 +1,359 @@
+"""
+Batched Neo4j writes for the ATT&CK push scripts.
+
+Instead of one MERGE (and often one session) per node, rows are grouped into
+batches and each batch is written by a single parameterized statement:
+
+    UNWIND $rows AS row MERGE (n:GPO {id: row.key}) SET n += row.props
+
+Relationships are grouped by (source label, type, target label) and written the
+same way, one UNWIND ... MATCH ... MERGE per group and batch.
+
+The statement text only depends on labels, type and key property, so Neo4j
+plans it once and reuses the plan for every batch.
+
+``BulkWriter`` goes one step further for multi-statement stages: it keeps one
+session open and groups statements into explicit transactions of a configurable
+size, tallying the update counters of everything it wrote:
+
+    with BulkWriter(driver, tx_size=100) as writer:
+        writer.write_nodes("GPO", techniques)
+        writer.write_edges(edges)
+        writer.run("MATCH ... MERGE ...")
+    print(writer.counters)
+
+``ensure_schema()`` creates the uniqueness constraints / indexes backing those
+MERGE and MATCH keys, so each lookup is an index seek instead of a label scan.
+
+``ParallelWriter`` spreads the same UNWIND batches over a pool of sessions: node
+batches partitioned by label, then edge rows partitioned by source node, so
+concurrent transactions rarely lock the same nodes. Transactions failing with a
+transient error (deadlocks included) are retried with jittered exponential backoff.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from types import TracebackType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from neo4j.exceptions import Neo4jError, TransientError
+
+# (source label, source key, relationship type, target label, target key)
+Edge = Tuple[str, Any, str, str, Any]
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_TX_SIZE = 50
+DEFAULT_INDEX_TIMEOUT = 300  # seconds to wait for new indexes to come online
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_RETRY_DELAY = 0.1  # seconds, doubled on every retry
+
+# SummaryCounters attributes accumulated by BulkWriter
+COUNTER_NAMES = (
+    "nodes_created", "nodes_deleted", "relationships_created", "relationships_deleted",
+    "properties_set", "labels_added", "labels_removed",
+    "indexes_added", "indexes_removed", "constraints_added", "constraints_removed",
+)
+
+
+def batched(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split ``iterable`` into lists of at most ``size`` items."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def node_upsert_query(label: str, key: str = "id") -> str:
+    return f"UNWIND $rows AS row MERGE (n:{label} {{{key}: row.key}}) SET n += row.props"
+
+
+def node_rows(properties: Iterable[Dict[str, Any]], key: str = "id") -> Iterator[Dict[str, Any]]:
+    """``{"key", "props"}`` rows for node_upsert_query(); maps without a value for ``key`` are skipped."""
+    for props in properties:
+        if props.get(key) not in (None, ""):
+            yield {"key": props[key], "props": props}
+
+
+def node_batches(label: str, properties: Iterable[Dict[str, Any]], key: str = "id",
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """(query, rows) pairs upserting ``label`` nodes, ``batch_size`` rows each; the node counterpart of edge_batches()."""
+    query = node_upsert_query(label, key)
+    for batch in batched(node_rows(properties, key), batch_size):
+        yield query, batch
+
+
+def _run_batch(tx: Any, query: str, rows: List[Dict[str, Any]]) -> None:
+    tx.run(query, rows=rows).consume()
+
+
+def write_batches(session: Any, query: str, rows: Iterable[Dict[str, Any]],
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Run ``query`` (which reads ``$rows``) once per batch, each in its own managed write transaction."""
+    written = 0
+    for batch in batched(rows, batch_size):
+        session.execute_write(_run_batch, query, batch)
+        written += len(batch)
+    return written
+
+
+def upsert_nodes(session: Any, label: str, properties: Iterable[Dict[str, Any]], key: str = "id",
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """MERGE ``label`` nodes on ``key`` and set the remaining properties, ``batch_size`` nodes per statement."""
+    return write_batches(session, node_upsert_query(label, key), node_rows(properties, key), batch_size)
+
+
+def edge_merge_query(src_label: str, rel_type: str, tgt_label: str, key: str = "id") -> str:
+    return (f"UNWIND $rows AS row "
+            f"MATCH (a:{src_label} {{{key}: row.src}}) MATCH (b:{tgt_label} {{{key}: row.tgt}}) "
+            f"MERGE (a)-[:`{rel_type}`]->(b)")
+
+
+def group_edges(edges: Iterable[Edge]) -> Dict[Tuple[str, str, str], List[Dict[str, Any]]]:
+    """``{(source label, type, target label): [{"src", "tgt"}, ...]}``, groups in first-seen order."""
+    groups: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+    for src_label, src_key, rel_type, tgt_label, tgt_key in edges:
+        groups.setdefault((src_label, rel_type, tgt_label), []).append({"src": src_key, "tgt": tgt_key})
+    return groups
+
+
+def edge_batches(edges: Iterable[Edge], key: str = "id",
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """(query, rows) pairs covering ``edges``: one query per label pair and type, ``batch_size`` rows each."""
+    for (src_label, rel_type, tgt_label), rows in group_edges(edges).items():
+        query = edge_merge_query(src_label, rel_type, tgt_label, key)
+        for batch in batched(rows, batch_size):
+            yield query, batch
+
+
+def merge_edges(session: Any, edges: Iterable[Edge], key: str = "id",
+                batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """MERGE relationships between nodes matched on ``key``, one statement per group and batch."""
+    written = 0
+    for query, batch in edge_batches(edges, key, batch_size):
+        session.execute_write(_run_batch, query, batch)
+        written += len(batch)
+    return written
+
+
+def schema_statements(label: str, prop: str) -> Tuple[str, str]:
+    """
+    (uniqueness constraint, plain index) statements for ``label.prop``, both idempotent. The names keep the
+    case of label and property, as Neo4j does: :OU(id) and :OU(ID) are different keys, and with IF NOT EXISTS
+    a clashing name would silently skip the second one.
+    """
+    name = f"{label}_{prop}"
+    return (f"CREATE CONSTRAINT `{name}_unique` IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE",
+            f"CREATE INDEX `{name}_index` IF NOT EXISTS FOR (n:{label}) ON (n.{prop})")
+
+
+def ensure_schema(run: Callable[[str], Any], unique: Iterable[Tuple[str, str]] = (),
+                  indexed: Iterable[Tuple[str, str]] = (), timeout: int = DEFAULT_INDEX_TIMEOUT,
+                  errors: Tuple[Type[BaseException], ...] = (Neo4jError,)) -> List[Tuple[str, str]]:
+    """
+    Create uniqueness constraints for the ``unique`` (label, property) keys and indexes for the ``indexed``
+    ones, then block until every index is online. ``run(query)`` executes one auto-commit statement and
+    raises one of ``errors`` on failure. A key whose constraint cannot be created (e.g. existing duplicates)
+    falls back to a plain index; an index that cannot be created (e.g. a constraint already covers the key)
+    is reported and skipped. Returns the keys whose index statement failed.
+    """
+    missing: List[Tuple[str, str]] = []
+    fallback: List[Tuple[str, str]] = []
+    for label, prop in unique:
+        try:
+            run(schema_statements(label, prop)[0])
+        except errors as e:
+            print(f"[!] No uniqueness constraint on :{label}({prop}), indexing instead: {e}")
+            fallback.append((label, prop))
+    for label, prop in [*fallback, *indexed]:
+        try:
+            run(schema_statements(label, prop)[1])
+        except errors as e:
+            print(f"[!] Could not index :{label}({prop}): {e}")
+            missing.append((label, prop))
+    run(f"CALL db.awaitIndexes({int(timeout)})")
+    return missing
+
+
+def session_runner(driver: Any) -> Callable[[str], Any]:
+    """``run`` callable for ensure_schema() executing each statement in its own session."""
+    def run(query: str) -> Any:
+        with driver.session() as session:
+            return session.run(query).consume()
+    return run
+
+
+class BulkWriter:
+    """
+    Context manager holding one session; statements passed to run() are grouped into explicit
+    transactions of ``tx_size`` statements. The open transaction is committed on exit (rolled
+    back if the block raised). ``counters`` sums the update counters of every statement, plus
+    ``statements`` and ``transactions``.
+    """
+
+    def __init__(self, driver: Any, tx_size: int = DEFAULT_TX_SIZE, batch_size: int = DEFAULT_BATCH_SIZE,
+                 database: Optional[str] = None):
+        self.driver = driver
+        self.tx_size = tx_size
+        self.batch_size = batch_size
+        self.database = database
+        self.counters: Counter[str] = Counter()
+        self.last_summary: Any = None  # ResultSummary of the latest run(), e.g. for its profile
+        self._session: Any = None
+        self._tx: Any = None
+        self._pending = 0
+
+    def __enter__(self) -> "BulkWriter":
+        self._session = self.driver.session(database=self.database) if self.database else self.driver.session()
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc: Optional[BaseException],
+                 tb: Optional[TracebackType]) -> None:
+        try:
+            if exc_type is None:
+                self.commit()
+            elif self._tx is not None:
+                self._tx.rollback()
+                self._tx = None
+        finally:
+            self._session.close()
+            self._session = None
+
+    def run(self, query: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Any]:
+        """Run ``query`` in the current transaction and return its records."""
+        if self._tx is None:
+            self._tx = self._session.begin_transaction()
+        result = self._tx.run(query, params, **kwargs)
+        records = list(result)
+        self.last_summary = result.consume()
+        counters = self.last_summary.counters
+        for name in COUNTER_NAMES:
+            self.counters[name] += getattr(counters, name, 0)
+        self.counters["statements"] += 1
+        self._pending += 1
+        if self._pending >= self.tx_size:
+            self.commit()
+        return records
+
+    def commit(self) -> None:
+        """Commit the open transaction, if any; the next run() starts a new one."""
+        if self._tx is not None:
+            self._tx.commit()
+            self._tx = None
+            self.counters["transactions"] += 1
+        self._pending = 0
+
+    def write_nodes(self, label: str, properties: Iterable[Dict[str, Any]], key: str = "id") -> int:
+        """Batched node upserts (see upsert_nodes()) as statements of this writer."""
+        written = 0
+        for query, batch in node_batches(label, properties, key, self.batch_size):
+            self.run(query, {"rows": batch})
+            written += len(batch)
+        return written
+
+    def write_edges(self, edges: Iterable[Edge], key: str = "id") -> int:
+        """Batched relationship merges (see merge_edges()) as statements of this writer."""
+        written = 0
+        for query, batch in edge_batches(edges, key, self.batch_size):
+            self.run(query, {"rows": batch})
+            written += len(batch)
+        return written
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={count}" for name, count in sorted(self.counters.items()) if count)
+
+
+def db_hits(plan: Optional[Dict[str, Any]]) -> int:
+    """Database hits summed over a profiled plan (ResultSummary.profile of a PROFILE statement)."""
+    if not plan:
+        return 0
+    return (plan.get("dbHits") or 0) + sum(db_hits(child) for child in plan.get("children") or [])
+
+
+def is_transient(error: Neo4jError) -> bool:
+    """True for errors worth retrying: TransientError and deadlock detection."""
+    return isinstance(error, TransientError) or "Deadlock" in (getattr(error, "code", None) or "")
+
+
+class ParallelWriter:
+    """
+    Runs UNWIND batches (``(query, {"rows": [...]})`` pairs, e.g. from edge_batches()) on ``workers``
+    sessions in parallel. Batches whose rows carry ``src`` are edge batches: their rows are
+    re-partitioned by source key and only written once every node batch has finished. Every other
+    batch is a node batch and is partitioned by its query text, i.e. by label. Each partition is
+    written sequentially by one worker.
+    """
+
+    def __init__(self, driver: Any, workers: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_retries: int = DEFAULT_MAX_RETRIES, retry_delay: float = DEFAULT_RETRY_DELAY,
+                 database: Optional[str] = None):
+        self.driver = driver
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.database = database
+        self.counters: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def write(self, nodes: Dict[str, Iterable[Dict[str, Any]]], edges: Iterable[Edge], key: str = "id") -> Counter[str]:
+        """Node upserts for every label, then relationship merges; see upsert_nodes() and merge_edges()."""
+        node_batches = [(node_upsert_query(label, key), {"rows": batch})
+                        for label, properties in nodes.items()
+                        for batch in batched(node_rows(properties, key), self.batch_size)]
+        return self.run([*node_batches, *((query, {"rows": rows}) for query, rows in edge_batches(edges, key))])
+
+    def run(self, statements: Iterable[Tuple[str, Dict[str, Any]]]) -> Counter[str]:
+        node_partitions: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        edge_rows: List[Dict[str, List[Dict[str, Any]]]] = [{} for _ in range(self.workers)]
+        for query, params in statements:
+            rows = params.get("rows") or []
+            if rows and "src" in rows[0]:
+                for row in rows:
+                    edge_rows[hash(row["src"]) % self.workers].setdefault(query, []).append(row)
+            else:
+                node_partitions.setdefault(query, []).append((query, params))
+        self._run_partitions(list(node_partitions.values()))
+        self._run_partitions([[(query, {"rows": batch}) for query, rows in partition.items()
+                               for batch in batched(rows, self.batch_size)]
+                              for partition in edge_rows if partition])
+        return self.counters
+
+    def _run_partitions(self, partitions: List[List[Tuple[str, Dict[str, Any]]]]) -> None:
+        if not partitions:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(partitions))) as pool:
+            futures = [pool.submit(self._write_partition, partition) for partition in partitions]
+        for future in futures:
+            future.result()  # re-raise the first failure
+
+    def _write_partition(self, partition: List[Tuple[str, Dict[str, Any]]]) -> None:
+        with (self.driver.session(database=self.database) if self.database else self.driver.session()) as session:
+            for query, params in partition:
+                self._write(session, query, params)
+
+    def _write(self, session: Any, query: str, params: Dict[str, Any]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with session.begin_transaction() as tx:
+                    counters = tx.run(query, params).consume().counters
+                    tx.commit()
+            except Neo4jError as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    raise
+                with self._lock:
+                    self.counters["retries"] += 1
+                time.sleep(self.retry_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+                continue
+            with self._lock:
+                for name in COUNTER_NAMES:
+                    self.counters[name] += getattr(counters, name, 0)
+                self.counters["statements"] += 1
+                self.counters["transactions"] += 1
+            return
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={count}" for name, count in sorted(self.counters.items()) if count)
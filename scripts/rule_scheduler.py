@@ -0,0 +1,131 @@
+"""
+Concurrent scheduling of independent mapping rules.
+
+Each ``Task`` declares the stages it ``requires`` and the graph state it
+``writes``, as (relationship type, source label) pairs. Two tasks conflict when
+they write the same relationship type from overlapping source labels. A label of
+None stands for any label, and the type ``ANY`` stands for any type. Tasks that
+do not conflict write disjoint parts of the graph, so they can run at the same
+time:
+
+    report = run_tasks([
+        Task("groups", map_groups, writes={("MAPS_TO_MITRE", "Group")}),
+        Task("sessions", map_sessions, writes={("USES_TECHNIQUE", "User")}),
+        Task("paths", map_paths, writes={("USES_TECHNIQUE", "User")}, requires={"groups"}),
+    ], workers=4)
+
+``run_tasks`` starts a task once all of its requirements have finished and no
+running or earlier-listed task conflicts with it. So conflicting tasks still run
+one at a time, in the order they were listed, and the whole run takes about as
+long as its longest chain of dependent or conflicting tasks. A task whose
+requirement failed is skipped. A task that raises is reported as failed and is
+not run again: retries belong inside the task, around each of its transactions
+(e.g. managed transactions, which the driver retries on deadlocks), so a retry
+never repeats work the task already committed. Each task's ``run`` returns its
+metrics (e.g. rows, relationships_created, db_hits), and these go into its
+report entry.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+ANY = "*"
+DEFAULT_WORKERS = 4
+
+Write = Tuple[str, Optional[str]]  # (relationship type or ANY, source label or None for any)
+
+
+@dataclass
+class Task:
+    name: str
+    run: Callable[[], Optional[Dict[str, Any]]]
+    writes: FrozenSet[Write] = frozenset({(ANY, None)})
+    requires: FrozenSet[str] = field(default_factory=frozenset)
+
+
+def conflicts(a: Task, b: Task) -> bool:
+    """True if ``a`` and ``b`` may write the same relationships (or touch the same nodes)."""
+    for type_a, label_a in a.writes:
+        for type_b, label_b in b.writes:
+            same_type = type_a == type_b or ANY in (type_a, type_b)
+            same_label = label_a is None or label_b is None or label_a == label_b
+            if same_type and same_label:
+                return True
+    return False
+
+
+def dependency_order(tasks: Iterable[Task]) -> List[Task]:
+    """``tasks`` with every task after its requirements, otherwise in the given order."""
+    pending = list(tasks)
+    names = {task.name for task in pending}
+    for task in pending:
+        missing = set(task.requires) - names
+        if missing:
+            raise ValueError(f"{task.name} requires unknown stages: {', '.join(sorted(missing))}")
+    ordered: List[Task] = []
+    placed: set = set()
+    while pending:
+        ready = next((task for task in pending if set(task.requires) <= placed), None)
+        if ready is None:
+            raise ValueError(f"Dependency cycle among: {', '.join(task.name for task in pending)}")
+        pending.remove(ready)
+        ordered.append(ready)
+        placed.add(ready.name)
+    return ordered
+
+
+def _execute(task: Task) -> Dict[str, Any]:
+    """The task's report entry; errors are reported, not raised."""
+    started = time.perf_counter()
+    entry: Dict[str, Any] = {"status": "ok", "error": None}
+    try:
+        entry.update(task.run() or {})
+    except Exception as e:
+        entry.update(status="failed", error=f"{type(e).__name__}: {e}")
+    entry["elapsed"] = time.perf_counter() - started
+    return entry
+
+
+def run_tasks(tasks: Iterable[Task], workers: int = DEFAULT_WORKERS) -> List[Dict[str, Any]]:
+    """
+    Run ``tasks`` on up to ``workers`` threads. Returns one report entry per task, in completion order:
+    {"rule", "status" (ok/failed/skipped), "started" (seconds after the run began), "elapsed", "error",
+    plus the task's metrics}.
+    """
+    waiting = dependency_order(tasks)
+    running: Dict[Any, Tuple[Task, float]] = {}
+    status: Dict[str, str] = {}
+    report: List[Dict[str, Any]] = []
+    run_started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        while waiting or running:
+            for task in list(waiting):
+                if len(running) >= max(workers, 1):
+                    break
+                failed = [name for name in task.requires if status.get(name, "ok") != "ok"]
+                if failed:
+                    waiting.remove(task)
+                    status[task.name] = "skipped"
+                    report.append({"rule": task.name, "status": "skipped", "started": None, "elapsed": 0.0,
+                                   "error": f"requires {', '.join(failed)}"})
+                    continue
+                if any(name not in status for name in task.requires):
+                    continue
+                earlier = waiting[:waiting.index(task)]
+                if any(conflicts(task, other) for other in [*earlier, *(t for t, _ in running.values())]):
+                    continue
+                waiting.remove(task)
+                future = pool.submit(_execute, task)
+                running[future] = (task, time.perf_counter() - run_started)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task, started = running.pop(future)
+                entry = {"rule": task.name, "started": started, **future.result()}
+                status[task.name] = entry["status"]
+                report.append(entry)
+    return report